@@ -0,0 +1,63 @@
+"""Amounts in words with Indian (lakh/crore) grouping.
+
+Replaces num2words(..., lang="en_IN") for quotation totals. Words come from
+precomputed tables for 0-99 and are already title-cased, so the output is
+identical to the previous num2words + .replace(",", "").title() logic
+without importing num2words or post-processing strings. Whole-rupee
+conversions are memoized.
+
+    amount_in_words(123456.5)
+    'One Lakh Twenty-Three Thousand Four Hundred And Fifty-Six Point Five Zero Rupees Only'
+    amount_in_words(123456.5, paise=True)
+    'Rupees One Lakh Twenty-Three Thousand Four Hundred Fifty-Six And Fifty Paise Only'
+"""
+from functools import lru_cache
+
+_ONES = [
+    "Zero", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine",
+    "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen", "Nineteen",
+]
+_TENS = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
+BELOW_100 = _ONES + [f"{_TENS[n // 10]}-{_ONES[n % 10]}" if n % 10 else _TENS[n // 10] for n in range(20, 100)]
+
+# (divisor, name, modulus of the group); crore is open-ended and may itself
+# run past 99, e.g. "One Hundred And Twenty-Three Crore"
+_GROUPS = ((10_000_000, "Crore", None), (100_000, "Lakh", 100), (1000, "Thousand", 100), (100, "Hundred", 10))
+
+
+@lru_cache(maxsize=4096)
+def integer_words(n):
+    # Title-cased words for a whole number, grouped in crore, lakh, thousand
+    # and hundred as num2words' en_IN converter does
+    if n < 0:
+        return f"Minus {integer_words(-n)}"
+    if n < 100:
+        return BELOW_100[n]
+    parts = []
+    for divisor, name, modulus in _GROUPS:
+        count = n // divisor if modulus is None else n // divisor % modulus
+        if count:
+            parts.append(f"{integer_words(count)} {name}")
+    rest = n % 100
+    if rest:
+        return f"{' '.join(parts)} And {BELOW_100[rest]}"
+    return " ".join(parts)
+
+
+def amount_in_words(grand_total, paise=False):
+    # Default: "... Point Two Five Rupees Only", paise read out digit by
+    # digit as on existing quotations. paise=True gives the cheque style
+    # "Rupees ... And Twenty-Five Paise Only", where the only "And" is the
+    # one before the paise (so 100.05 and 105 can't be confused).
+    total_amount = round(grand_total, 2)
+    rupees = int(total_amount)
+    decimal_part = int(round((total_amount - rupees) * 100))
+    if paise:
+        words = f"Rupees {integer_words(rupees).replace(' And ', ' ')}"
+        if decimal_part > 0:
+            words += f" And {integer_words(decimal_part)} Paise"
+        return words + " Only"
+    words = integer_words(rupees)
+    if decimal_part > 0:
+        words += " Point " + " ".join(_ONES[int(d)] for d in f"{decimal_part:02d}")
+    return words + " Rupees Only"
@@ -0,0 +1,200 @@
+"""HTTP quotation service for CRM integrations.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+POST /quote prices a quotation and returns the totals as JSON. POST
+/quote/pdf also renders it and returns the PDF. Both use the same pricing
+and PDF code as the Streamlit app. Like the app, /quote/pdf records every
+quotation it returns in the quotation store ($QUOTATION_DB, see
+quotation_store.py): a blank quotation_no is given the next number in the
+series, which comes back in the X-Quotation-No header, and reusing an issued
+number with different details is a 409. /quote records nothing. Pricing is microseconds and runs on the
+event loop. PDF rendering is CPU-bound, so it runs in a bounded process pool
+and the loop stays responsive. Requests beyond QUOTE_API_MAX_CONCURRENT wait
+up to QUOTE_API_QUEUE_TIMEOUT seconds for a slot, then get a 503.
+
+GET /metrics serves per-stage timings in the Prometheus text format. With
+QUOTE_API_PROFILING=1, POST /quote/pdf?profile=cprofile (or pyinstrument)
+renders that one request under the profiler and returns the report instead
+of the PDF; profiled requests aren't recorded.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel
+
+from instrumentation import PROFILERS, REGISTRY, collect_stages, merge_stages, profiled, stage
+from parallel_render import issue_row, pdf_filename, quote_row, render_row
+from quotation_store import QuotationExists, QuotationStore
+
+MAX_CONCURRENT = int(os.environ.get("QUOTE_API_MAX_CONCURRENT", "64"))
+QUEUE_TIMEOUT = float(os.environ.get("QUOTE_API_QUEUE_TIMEOUT", "10"))
+RENDER_WORKERS = int(os.environ.get("QUOTE_API_RENDER_WORKERS", "0")) or os.cpu_count() or 1
+# "process" (default) or "thread"; threads avoid worker start-up cost but
+# share one core for rendering
+RENDER_POOL = os.environ.get("QUOTE_API_RENDER_POOL", "process")
+PROFILING = bool(os.environ.get("QUOTE_API_PROFILING"))
+
+
+class VMGroup(BaseModel):
+    label: str = "App server"
+    num_vms: int = 1
+    vcpu: int
+    ram: int
+    storage: int
+
+
+class QuoteRequest(BaseModel):
+    customer_name: str = ""
+    customer_address: str = ""
+    customer_gstn: str = ""
+    customer_email: str = ""
+    quotation_no: str = ""
+    quotation_date: str = ""
+    num_vms: int = 1
+    vcpu: int = 1
+    ram: int = 1
+    storage: int = 1
+    vm_groups: List[VMGroup] = []
+    antivirus: int = 0
+    backup: int = 0
+    db: int = 0
+    os_type: str = "linux"
+    os_qty: int = 0
+    bandwidth: str = "Default"
+    discount: int = 0
+    region: Optional[str] = None
+    catalog_version: Optional[str] = None
+    optimize: bool = False
+    allow_split: bool = False
+    itemized: bool = False
+
+    def row(self):
+        return self.model_dump()
+
+    def optimize_options(self):
+        return {"allow_split": self.allow_split} if self.optimize else None
+
+
+def quote_summary(quote, monthly_savings):
+    return {
+        "region": quote["region"],
+        "catalog_version": quote["catalog_version"],
+        "vm_groups": [
+            {
+                **priced["group"],
+                "base_vm": priced["base_vm"],
+                "per_vm_cost": priced["per_vm_cost"],
+                "total_vm_monthly": priced["total_vm_monthly"],
+            }
+            for priced in quote["vm_groups"]
+        ],
+        "total_vm_monthly": quote["total_vm_monthly"],
+        "total_vm_annual": quote["total_vm_annual"],
+        "mgmt_monthly": quote["mgmt_monthly"],
+        "mgmt_annual": quote["mgmt_annual"],
+        "bandwidth_cost": quote["bandwidth_cost"],
+        "discount_percent": quote["discount_percent"],
+        "discount_amt": quote["discount_amt"],
+        "final_total": quote["final_total"],
+        "tax": quote["tax"],
+        "grand_total": quote["grand_total"],
+        "monthly_savings": monthly_savings,
+    }
+
+
+def issue_with_timings(row, optimize, itemized, store):
+    # Runs in the render pool; the quotation number and stage timings come
+    # back with the PDF so the API process can record them
+    with collect_stages() as timings:
+        _, _, pdf_data, number = issue_row(row, store, optimize, itemized=itemized)
+    return pdf_data, number, timings
+
+
+def profile_render(row, optimize, itemized, profiler):
+    with profiled(profiler) as result:
+        render_row(row, optimize, itemized)
+    return result["report"]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.limit = asyncio.Semaphore(MAX_CONCURRENT)
+    pool_class = ThreadPoolExecutor if RENDER_POOL == "thread" else ProcessPoolExecutor
+    app.state.render_pool = pool_class(max_workers=RENDER_WORKERS)
+    app.state.store = QuotationStore()
+    try:
+        yield
+    finally:
+        app.state.render_pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="VM Hosting Quotation API", lifespan=lifespan)
+
+
+@asynccontextmanager
+async def request_slot():
+    try:
+        await asyncio.wait_for(app.state.limit.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(503, "Too many concurrent quotation requests, retry shortly", headers={"Retry-After": "1"})
+    try:
+        yield
+    finally:
+        app.state.limit.release()
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/quote")
+async def price_quote(request: QuoteRequest):
+    async with request_slot():
+        with stage("request.price"):
+            try:
+                quote, monthly_savings = quote_row(request.row(), request.optimize_options())
+            except ValueError as e:
+                raise HTTPException(422, str(e))
+    return quote_summary(quote, monthly_savings)
+
+
+@app.post("/quote/pdf")
+async def quote_pdf(request: QuoteRequest, profile: Optional[str] = None):
+    if profile is not None and (not PROFILING or profile not in PROFILERS):
+        raise HTTPException(400, f"profiling is disabled, or profile is not one of {PROFILERS}")
+    async with request_slot():
+        loop = asyncio.get_running_loop()
+        with stage("request.pdf"):
+            try:
+                if profile is not None:
+                    # Profiled in a thread of this process, outside the pool
+                    report = await asyncio.to_thread(profile_render, request.row(), request.optimize_options(), request.itemized, profile)
+                    return PlainTextResponse(report)
+                pdf_data, number, timings = await loop.run_in_executor(
+                    app.state.render_pool, issue_with_timings, request.row(), request.optimize_options(), request.itemized, app.state.store
+                )
+            except QuotationExists as e:
+                raise HTTPException(409, f"{e}; leave quotation_no blank to issue a new number")
+            except ValueError as e:
+                raise HTTPException(422, str(e))
+            except ImportError as e:
+                raise HTTPException(400, str(e))
+    if RENDER_POOL != "thread":
+        merge_stages(timings)
+    filename = pdf_filename({"quotation_no": number}, 0)
+    return Response(
+        pdf_data, media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Quotation-No": number},
+    )
@@ -0,0 +1,265 @@
+"""Headless batch quotations.
+
+Streams deals from a CSV or JSONL file (or reads a .json array of row
+objects), prices each one with the same engine as the Streamlit app, and
+writes priced results plus one PDF per row:
+
+    python batch.py deals.csv --out-dir quotations --results priced.csv
+    python batch.py deals.csv --zip quotations.zip --workers 0
+    python batch.py renewals.csv --out-dir quotations --pdf-cache .pdf-cache
+
+Input columns are the Streamlit widget keys (num_vms, vcpu, ram, storage,
+antivirus, backup, db, os_type, os_qty, bandwidth, discount) plus the
+customer fields (customer_name, customer_address, customer_gstn,
+customer_email, quotation_no, quotation_date). Missing columns fall back to
+the app defaults. A deal spanning several VM groups passes them as a
+vm_groups JSON list of {label, num_vms, vcpu, ram, storage} objects.
+Optional region and catalog_version columns re-price a row against that
+price catalog instead of the current one. PDFs are named after
+quotation_no; a row repeating an earlier row's number gets its row number
+appended (Q1_row7.pdf). With --pdf-cache, rows whose
+quotation is unchanged since an earlier run reuse that run's PDF instead of
+rendering it again.
+
+Batch runs don't record what they price unless asked: with --issue each row
+is recorded in the quotation store ($QUOTATION_DB, see quotation_store.py)
+like a quotation issued from the app, rows with a blank quotation_no are
+given the next number in the series, and the results file reports the
+number each row was issued under. Re-running an issued file with those
+numbers filled in returns the stored quotations instead of issuing again.
+
+    python batch.py renewals.csv --out-dir quotations --issue --results issued.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from instrumentation import REGISTRY, stage, stage_summary
+from parallel_render import DirectorySink, ZipSink, iter_render, write_result
+from pricing import CUSTOMER_FIELDS, SPEC_DEFAULTS
+
+# Every column an input row may have; vcpu, ram, storage, label and tier
+# describe its single VM group when there's no vm_groups list
+INPUT_FIELDS = frozenset((*CUSTOMER_FIELDS, *SPEC_DEFAULTS, "vm_groups", "label", "tier", "region", "catalog_version"))
+RESULT_FIELDS = [
+    "row", *CUSTOMER_FIELDS, *SPEC_DEFAULTS, "vm_groups", "region", "catalog_version",
+    "base_vm", "per_vm_cost", "total_vm_monthly", "total_vm_annual", "mgmt_monthly", "mgmt_annual",
+    "bandwidth_cost", "discount_amt", "final_total", "tax", "grand_total", "monthly_savings", "pdf", "error",
+]
+
+
+def file_format(path):
+    # "jsonl" (one object per line), "json" (an array of objects) or "csv",
+    # by extension
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "json" if ext == ".json" else "csv"
+
+
+def unknown_columns(row):
+    # Column names pricing doesn't read; a misspelt one would otherwise be
+    # priced silently at its default. Unnamed CSV columns left blank, as
+    # spreadsheets export trailing ones, are fine.
+    if not isinstance(row, dict):
+        return []
+    return sorted(str(name) for name, value in row.items() if name not in INPUT_FIELDS and (name or value))
+
+
+def iter_rows(path):
+    # One row at a time, so memory stays flat regardless of file size. A
+    # JSONL line that doesn't parse, or a row with columns pricing doesn't
+    # know, is yielded as a ValueError, which fails that row alone.
+    # utf-8-sig: Excel's "CSV UTF-8" starts with a byte-order mark, which
+    # would otherwise stick to the first column name. A .json array is
+    # the exception to flat memory: it has to be parsed whole.
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        fmt = file_format(path)
+        if fmt == "jsonl":
+            rows = _jsonl_rows(f)
+        elif fmt == "json":
+            rows = _json_array_rows(f, path)
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            unknown = unknown_columns(row)
+            yield ValueError(f"unknown columns {unknown}") if unknown else row
+
+
+def _jsonl_rows(f):
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"line {line_no} is not valid JSON: {e}")
+
+
+def _json_array_rows(f, path):
+    # A file that isn't a JSON array can't be split into rows, so it fails
+    # the whole run
+    try:
+        rows = json.load(f)
+    except ValueError as e:
+        raise ValueError(f"{path} is not valid JSON: {e}") from None
+    if not isinstance(rows, list):
+        raise ValueError(f"{path} must hold a JSON array of row objects, got {type(rows).__name__}")
+    return rows
+
+
+def result_row(index, row, quote, pdf_path, error=None, monthly_savings=None):
+    result = {"row": index}
+    # Rows that couldn't be read only have their error to report
+    row = row if isinstance(row, dict) else {}
+    result.update({field: row.get(field, "") for field in CUSTOMER_FIELDS})
+    if quote is None:
+        result.update({field: row.get(field, "") for field in (*SPEC_DEFAULTS, "vm_groups", "region", "catalog_version")})
+        result["error"] = error
+        return result
+    result.update(quote["spec"])
+    # Several VM groups are joined with "; " in the per-group columns
+    groups = quote["vm_groups"]
+    result.update({
+        "vm_groups": json.dumps(quote["spec"]["vm_groups"]) if len(groups) > 1 else "",
+        "region": quote["region"],
+        "catalog_version": quote["catalog_version"],
+        "base_vm": "; ".join(f"{g['base_vm']['vCPU']}vCPU {g['base_vm']['RAM']}GB {g['base_vm']['Storage']}GB" for g in groups),
+        "per_vm_cost": "; ".join(str(g["per_vm_cost"]) for g in groups) if len(groups) > 1 else groups[0]["per_vm_cost"],
+        "total_vm_monthly": quote["total_vm_monthly"],
+        "total_vm_annual": quote["total_vm_annual"],
+        "mgmt_monthly": quote["mgmt_monthly"],
+        "mgmt_annual": quote["mgmt_annual"],
+        "bandwidth_cost": quote["bandwidth_cost"],
+        "discount_amt": round(quote["discount_amt"], 2),
+        "final_total": round(quote["final_total"], 2),
+        "tax": quote["tax"],
+        "grand_total": round(quote["grand_total"], 2),
+        "monthly_savings": "" if monthly_savings is None else monthly_savings,
+        "pdf": pdf_path or "",
+        "error": error or "",
+    })
+    return result
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self.path = path
+        self.format = file_format(path)
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.count = 0
+        if self.format == "csv":
+            self.writer = csv.DictWriter(self.f, fieldnames=RESULT_FIELDS)
+            self.writer.writeheader()
+        elif self.format == "json":
+            # Streamed as an array, one result per line
+            self.f.write("[")
+
+    def write(self, result):
+        if self.format == "jsonl":
+            self.f.write(json.dumps(result) + "\n")
+        elif self.format == "json":
+            self.f.write(("," if self.count else "") + "\n" + json.dumps(result))
+        else:
+            self.writer.writerow(result)
+        self.count += 1
+
+    def close(self):
+        if self.format == "json":
+            self.f.write("\n]\n")
+        self.f.close()
+
+
+def run_batch(input_path, results_path, out_dir=None, zip_path=None, workers=1, chunksize=16, ordered=True, optimize=None, pdf_cache=None, store=None):
+    # Returns (rows, failed rows, PDFs served from pdf_cache, elapsed seconds).
+    # Rows that fail to price or render are recorded with their error in the
+    # results file. With a QuotationStore every row is issued into it.
+    render = bool(out_dir or zip_path)
+    sink = None
+    if zip_path:
+        sink = ZipSink(sys.stdout.buffer if zip_path == "-" else zip_path)
+    elif out_dir:
+        sink = DirectorySink(out_dir)
+
+    writer = ResultWriter(results_path)
+    count = failed = cache_hits = 0
+    start = time.perf_counter()
+    try:
+        jobs = enumerate(iter_rows(input_path), 1)
+        for result in iter_render(jobs, workers, chunksize, ordered, render, optimize, pdf_cache, store):
+            pdf_path = None
+            if sink is not None:
+                with stage("output.write"):
+                    pdf_path = write_result(sink, result)
+            if result["error"]:
+                failed += 1
+            cache_hits += result["cache_hit"]
+            writer.write(result_row(result["index"], result["row"], result["quote"], pdf_path, result["error"], result["monthly_savings"]))
+            count += 1
+    finally:
+        writer.close()
+        if sink is not None:
+            sink.close()
+        if pdf_cache is not None:
+            pdf_cache.evict()
+    return count, failed, cache_hits, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price a CSV/JSONL file of deals and render one PDF quotation per row.")
+    parser.add_argument("input", help="CSV, JSONL or JSON-array file of quotation inputs")
+    parser.add_argument("--results", default="priced.csv", help="where to write priced rows (.csv, .jsonl or .json)")
+    parser.add_argument("--out-dir", default="quotations", help="directory for the rendered PDFs")
+    parser.add_argument("--zip", help="write the PDFs into this ZIP archive instead of --out-dir ('-' for stdout)")
+    parser.add_argument("--no-pdf", action="store_true", help="price only, skip PDF rendering")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for pricing/rendering (0 = one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=16, help="rows handed to a worker at a time")
+    parser.add_argument("--unordered", action="store_true", help="write results as workers finish instead of in input order")
+    parser.add_argument("--optimize", action="store_true", help="quote each VM group on its cheapest tier instead of the vCPU-based one")
+    parser.add_argument("--allow-split", action="store_true", help="with --optimize, allow serving a VM as several smaller VMs")
+    parser.add_argument("--pdf-cache", help="reuse PDFs rendered by earlier runs from this cache directory; --out-dir files are hard-linked to it")
+    parser.add_argument("--pdf-cache-size", type=int, default=1024, help="evict least recently used cached PDFs beyond this many MB (default 1024)")
+    parser.add_argument("--issue", action="store_true", help="record every row in the quotation store ($QUOTATION_DB), numbering rows without a quotation_no")
+    parser.add_argument("--timings", action="store_true", help="print a per-stage timing summary when done")
+    parser.add_argument("--metrics", help="write per-stage Prometheus metrics to this file when done (node_exporter textfile format)")
+    args = parser.parse_args(argv)
+    if args.issue and args.pdf_cache:
+        parser.error("--issue keeps the PDFs in the quotation store and can't be combined with --pdf-cache")
+
+    out_dir = None if args.no_pdf or args.zip else args.out_dir
+    zip_path = None if args.no_pdf else args.zip
+    pdf_cache = None
+    if args.pdf_cache and not args.no_pdf:
+        from pdf_cache import PDFCache
+        pdf_cache = PDFCache(args.pdf_cache, max_bytes=args.pdf_cache_size * 1024 * 1024)
+    store = None
+    if args.issue:
+        from quotation_store import QuotationStore
+        store = QuotationStore()
+    count, failed, cache_hits, elapsed = run_batch(
+        args.input, args.results, out_dir, zip_path,
+        workers=args.workers or None, chunksize=args.chunksize, ordered=not args.unordered,
+        optimize={"allow_split": args.allow_split} if args.optimize else None, pdf_cache=pdf_cache, store=store,
+    )
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {count} rows in {elapsed:.2f}s ({rate:,.1f} rows/s)", file=sys.stderr)
+    if pdf_cache is not None:
+        print(f"{cache_hits} of {count} PDFs unchanged since an earlier run, served from {args.pdf_cache}", file=sys.stderr)
+    if args.timings:
+        print(f"{'stage':16} {'count':>8} {'total s':>9} {'mean ms':>9} {'p95 ms <=':>10}", file=sys.stderr)
+        for row in stage_summary():
+            print(f"{row['stage']:16} {row['count']:8d} {row['total_s']:9.2f} {row['mean_ms']:9.2f} {row['p95_ms']:10.1f}", file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.expose())
+    if failed:
+        print(f"{failed} rows failed, see the error column in {args.results}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
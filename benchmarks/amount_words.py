@@ -0,0 +1,62 @@
+"""amount_in_words() against the num2words-based conversion it replaced.
+
+    python benchmarks/amount_words.py -n 100000
+
+Checks both produce identical text on every amount, then times them on
+distinct amounts (cold cache) and on a bulk run that repeats a small set
+of totals, as renewal batches do (warm cache).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from num2words import num2words  # noqa: E402
+
+from amount_words import amount_in_words, integer_words  # noqa: E402
+
+
+def num2words_amount_in_words(grand_total):
+    # The previous implementation, kept verbatim for comparison
+    total_amount = round(grand_total, 2)
+    words = num2words(int(total_amount), lang='en_IN').replace(',', '').title()
+    decimal_part = int(round((total_amount - int(total_amount)) * 100))
+    if decimal_part > 0:
+        decimal_words = ' '.join([num2words(int(d), lang='en_IN').title() for d in f'{decimal_part:02d}'])
+        words += f" Point {decimal_words}"
+    return words + " Rupees Only"
+
+
+def time_per_call(convert, amounts):
+    start = time.perf_counter()
+    for amount in amounts:
+        convert(amount)
+    return (time.perf_counter() - start) / len(amounts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=100_000, help="amounts to convert per run")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    distinct = [round(rng.uniform(0, 1e9), 2) for _ in range(args.n)]
+    repeated = [rng.choice(distinct[:500]) for _ in range(args.n)]
+
+    mismatches = [amount for amount in distinct if amount_in_words(amount) != num2words_amount_in_words(amount)]
+    print(f"identical output on {len(distinct) - len(mismatches)}/{len(distinct)} amounts")
+
+    for label, amounts in (("distinct amounts", distinct), ("repeated totals", repeated)):
+        integer_words.cache_clear()
+        before = time_per_call(num2words_amount_in_words, amounts)
+        after = time_per_call(amount_in_words, amounts)
+        print(f"{label:18} num2words {before * 1e6:8.2f} us   amount_words {after * 1e6:8.2f} us   ({before / after:.1f}x)")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Cold-start import budget for the CLI and worker entry points.
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --scale 2   # slower machine
+
+Imports each entry point in a fresh interpreter under `python -X importtime`
+and fails (exit 1) if it takes longer than its budget or pulls in a module
+it must not need, e.g. pandas or streamlit for pricing-only workers. The
+forbidden-module checks hold on any machine, so tests/test_imports.py runs
+them with the test suite too; the millisecond budgets are
+two to three times the best-of-N times measured when they were set, so slower
+machines may need --scale.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_ONLY = ("streamlit", "pandas")
+RENDER_ONLY = ("fpdf", "PIL", "fontTools", "numpy")
+
+# module -> (budget in ms, modules it must not import)
+ENTRY_POINTS = {
+    "pricing": (20, (*APP_ONLY, *RENDER_ONLY, "num2words", "multiprocessing")),
+    "optimizer": (20, (*APP_ONLY, *RENDER_ONLY, "num2words", "multiprocessing")),
+    "amount_words": (5, (*APP_ONLY, *RENDER_ONLY, "num2words")),
+    "parallel_render": (25, (*APP_ONLY, *RENDER_ONLY, "num2words", "multiprocessing")),
+    "batch": (30, (*APP_ONLY, *RENDER_ONLY, "num2words", "multiprocessing")),
+    "quotation_store": (25, (*APP_ONLY, *RENDER_ONLY, "num2words")),
+    "quotation_pdf": (800, (*APP_ONLY, "num2words")),
+    "scenario_sweep": (200, (*APP_ONLY, "fpdf", "PIL", "fontTools", "num2words", "multiprocessing")),
+}
+
+
+def import_times(module):
+    # {imported module: cumulative microseconds} for one cold import
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per entry point, best one counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module, (budget_ms, forbidden) in ENTRY_POINTS.items():
+        runs = [import_times(module) for _ in range(args.runs)]
+        best_ms = min(times[module] for times in runs) / 1000
+        budget_ms *= args.scale
+        loaded = sorted({name for name in forbidden for times in runs if name in times})
+        status = "ok"
+        if best_ms > budget_ms:
+            status = "OVER BUDGET"
+            failures.append(f"{module} took {best_ms:.1f}ms, budget {budget_ms:.0f}ms")
+        if loaded:
+            status = "FORBIDDEN IMPORTS"
+            failures.append(f"{module} imports {', '.join(loaded)}")
+        print(f"{module:18} {best_ms:8.1f} ms  (budget {budget_ms:5.0f} ms)  {status}")
+
+    if failures:
+        print("\n" + "\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
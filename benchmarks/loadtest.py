@@ -0,0 +1,81 @@
+"""Load test for the quotation API (api.py).
+
+    uvicorn api:app --port 8000 &
+    python benchmarks/loadtest.py --endpoint pdf -n 500 -c 16
+
+Fires `-n` requests from `-c` concurrent clients and reports latency
+percentiles and throughput. Standard library only.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = {"price": "/quote", "pdf": "/quote/pdf"}
+PAYLOAD = {
+    "customer_name": "Load Test Customer Pvt Ltd",
+    "customer_address": "Sector 62, Noida",
+    "customer_gstn": "09ABCDE1234F1Z5",
+    "quotation_no": "LOAD-0001",
+    "quotation_date": "01-04-2026",
+    "num_vms": 4, "vcpu": 6, "ram": 16, "storage": 500,
+    "antivirus": 4, "backup": 4, "discount": 10,
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def send(url, body, timeout):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = None
+    return time.perf_counter() - start, status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the API")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="price")
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/") + ENDPOINTS[args.endpoint]
+    body = json.dumps(PAYLOAD).encode("utf-8")
+    send(url, body, args.timeout)  # warm up the worker pool
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda _: send(url, body, args.timeout), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, status in results if status == 200)
+    errors = {}
+    for _, status in results:
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+    print(f"{args.requests} requests to {url}, concurrency {args.concurrency}")
+    print(f"throughput: {len(latencies) / elapsed:8.1f} req/s ({elapsed:.2f}s)")
+    for p in (50, 95, 99):
+        print(f"p{p}:        {percentile(latencies, p) * 1000:8.2f} ms")
+    if errors:
+        print("errors:     " + ", ".join(f"{status or 'connection'}: {count}" for status, count in sorted(errors.items(), key=str)))
+
+
+if __name__ == "__main__":
+    main()
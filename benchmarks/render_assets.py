@@ -0,0 +1,44 @@
+"""Per-document render time with and without the static asset cache.
+
+    python benchmarks/render_assets.py -n 200
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import normalize_spec, price_quotation  # noqa: E402
+from quotation_pdf import PDF, build_quotation_pdf  # noqa: E402
+
+CUSTOMER_INFO = {"name": "Benchmark Customer Pvt Ltd", "address": "Sector 62, Noida", "gstn": "09ABCDE1234F1Z5", "email": ""}
+QUOTATION_INFO = {"number": "BENCH-0001", "date": "01-04-2026"}
+
+
+def time_renders(quote, n, use_asset_cache):
+    PDF.use_asset_cache = use_asset_cache
+    start = time.perf_counter()
+    for _ in range(n):
+        bytes(build_quotation_pdf(quote, CUSTOMER_INFO, QUOTATION_INFO).output())
+    return (time.perf_counter() - start) / n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=200, help="documents to render per mode")
+    args = parser.parse_args(argv)
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    quote = price_quotation(normalize_spec({"num_vms": 4, "vcpu": 6, "ram": 16, "storage": 500, "antivirus": 4, "backup": 4, "discount": 10}))
+    # Warm up imports and font metrics before timing
+    time_renders(quote, 5, True)
+    before = time_renders(quote, args.n, False)
+    after = time_renders(quote, args.n, True)
+    print(f"without asset cache: {before * 1000:8.2f} ms/document")
+    print(f"with asset cache:    {after * 1000:8.2f} ms/document ({(1 - after / before) * 100:.1f}% faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Benchmark suite for the pricing, table layout and PDF rendering hot paths.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline benchmarks/baselines/reference.json
+    python benchmarks/suite.py --filter pdf.table --quick
+
+Every case is timed over several rounds on the same inputs; the best round
+is the figure compared against a baseline (the least noisy on a shared
+machine), the median is reported alongside. With --baseline the run exits 1
+if any case is more than --tolerance slower than its stored figure, so
+regressions show up in CI. Baselines are only comparable on the same
+machine; record one with --output after a known-good commit.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from pricing import main_table_rows, normalize_spec, price_quotation  # noqa: E402
+from quotation_pdf import PDF, amount_in_words, quotation_dataframes, render_quotation_bytes  # noqa: E402
+from scenario_sweep import sweep  # noqa: E402
+
+CUSTOMER_INFO = {"name": "Benchmark Customer Pvt Ltd", "address": "Sector 62, Noida", "gstn": "09ABCDE1234F1Z5", "email": ""}
+QUOTATION_INFO = {"number": "BENCH-0001", "date": "01-04-2026"}
+SAMPLE_SPEC = {"num_vms": 4, "vcpu": 6, "ram": 16, "storage": 500, "antivirus": 4, "backup": 4, "db": 1, "os_qty": 4, "discount": 10}
+
+
+def random_specs(n, seed=0):
+    rng = random.Random(seed)
+    specs = []
+    for _ in range(n):
+        num_vms = rng.randint(1, 20)
+        specs.append(normalize_spec({
+            "num_vms": num_vms,
+            "vcpu": rng.randint(1, 32),
+            "ram": rng.randint(1, 256),
+            "storage": rng.randint(1, 4000),
+            "antivirus": rng.randint(0, num_vms),
+            "backup": rng.randint(0, num_vms),
+            "db": rng.randint(0, 3),
+            "os_type": rng.choice(["linux", "windows"]),
+            "os_qty": rng.randint(0, num_vms),
+            "discount": rng.randint(0, 30),
+        }))
+    return specs
+
+
+def table_dataframe(rows):
+    # Infra annex shaped like vm_table_rows(): a wrapped description column
+    # plus four numeric columns
+    quote = price_quotation(normalize_spec(SAMPLE_SPEC))
+    base = quotation_dataframes(quote)[0].to_dict("records")
+    records = []
+    for i in range(rows):
+        record = dict(base[i % len(base)])
+        record["Item/Specification"] = f"Site {i // len(base) + 1} {record['Item/Specification']}"
+        records.append(record)
+    df = pd.DataFrame(records)
+    df.index += 1
+    return df
+
+
+# ---- Cases ----
+# Each case builder returns (run, items): `run` does one round of work over
+# `items` items, inputs are built once outside the timed region
+def case_pricing(n):
+    def build():
+        specs = random_specs(n)
+
+        def run():
+            for spec in specs:
+                price_quotation(spec)
+        return run, n
+    return build
+
+
+def case_pdf_table(rows):
+    def build():
+        df = table_dataframe(rows)
+
+        def run():
+            # Cold layout each round; the layout caches would otherwise make
+            # every round after the first a replay
+            PDF._width_cache.clear()
+            PDF._split_cache.clear()
+            pdf = PDF()
+            pdf.add_page()
+            pdf.table("Infrastructure Cost", df)
+        return run, rows
+    return build
+
+
+def case_render_single():
+    quote = price_quotation(normalize_spec(SAMPLE_SPEC))
+
+    def run():
+        render_quotation_bytes(quote, CUSTOMER_INFO, QUOTATION_INFO)
+    return run, 1
+
+
+def case_render_bulk(n):
+    def build():
+        quotes = [price_quotation(spec) for spec in random_specs(n, seed=1)]
+
+        def run():
+            for quote in quotes:
+                render_quotation_bytes(quote, CUSTOMER_INFO, QUOTATION_INFO, itemized=True)
+        return run, n
+    return build
+
+
+def case_main_table_rows():
+    quotes = [price_quotation(spec) for spec in random_specs(1000, seed=2)]
+
+    def run():
+        for quote in quotes:
+            main_table_rows(quote, itemized=True)
+    return run, len(quotes)
+
+
+def case_amount_in_words(n):
+    def build():
+        rng = random.Random(3)
+        amounts = [round(rng.uniform(0, 5e8), 2) for _ in range(n)]
+
+        def run():
+            for amount in amounts:
+                amount_in_words(amount)
+        return run, n
+    return build
+
+
+def case_sweep():
+    # 120 VM counts x 26 discounts x both bandwidth plans x 20 backup counts,
+    # ~115k scenarios once those with more backups than VMs are left out
+    spec = normalize_spec(SAMPLE_SPEC)
+    axes = {"num_vms": range(1, 121), "discount": range(0, 26), "bandwidth": ["Default", "Dedicated 10 MBPS"], "backup": range(0, 20)}
+    points = len(sweep(spec, **axes)["grand_total"])
+
+    def run():
+        sweep(spec, **axes)
+    return run, points
+
+
+# name -> (builder, rounds, heavy); --quick skips the heavy cases
+CASES = {
+    "pricing.scalar[1]": (case_pricing(1), 200, False),
+    "pricing.scalar[10k]": (case_pricing(10_000), 5, False),
+    "pricing.scalar[1M]": (case_pricing(1_000_000), 1, True),
+    "pricing.main_table_rows[1k]": (case_main_table_rows, 5, False),
+    "pdf.table[10]": (case_pdf_table(10), 20, False),
+    "pdf.table[100]": (case_pdf_table(100), 5, False),
+    "pdf.table[1000]": (case_pdf_table(1000), 3, True),
+    "render.single": (case_render_single, 20, False),
+    "render.bulk[50]": (case_render_bulk(50), 3, True),
+    "amount_in_words[10k]": (case_amount_in_words(10_000), 5, False),
+    "sweep[100k]": (case_sweep, 10, False),
+}
+
+
+def time_case(build, rounds):
+    run, items = build()
+    run()  # warm up imports, font metrics and catalog loading
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "items": items,
+        "rounds": rounds,
+        "best_s": best,
+        "median_s": statistics.median(timings),
+        "per_item_us": best / items * 1e6,
+    }
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Returns the names of cases slower than baseline by more than `tolerance`
+    regressions = []
+    print(f"\n{'case':32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        stored = baseline.get("results", {}).get(name)
+        if stored is None or stored["items"] != result["items"]:
+            print(f"{name:32} {'-':>12} {result['per_item_us']:10.2f}us {'new':>8}")
+            continue
+        change = result["per_item_us"] / stored["per_item_us"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:32} {stored['per_item_us']:10.2f}us {result['per_item_us']:10.2f}us {change * 100:+7.1f}%{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M-spec, 1000-row and bulk cases")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (default 0.25 = 25%%)")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    args = parser.parse_args(argv)
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    if args.list:
+        print("\n".join(CASES))
+        return
+
+    results = {}
+    for name, (build, rounds, heavy) in CASES.items():
+        if args.filter not in name or (args.quick and heavy):
+            continue
+        result = results[name] = time_case(build, rounds)
+        print(f"{name:32} {result['best_s'] * 1000:10.2f} ms  {result['per_item_us']:10.2f} us/item  (median {result['median_s'] * 1000:.2f} ms, {rounds} rounds)", flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine_info(), "results": results}, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed more than {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
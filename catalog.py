@@ -0,0 +1,144 @@
+"""Versioned price catalogs.
+
+Catalogs live in catalogs/<region>/<version>.json and are loaded once per
+process. Versions must sort chronologically as strings (e.g. 2026-Q4); the
+highest one is the current price list, older ones stay available so a
+quotation can be re-priced against the catalog it was issued under. Files
+are re-checked at most every `check_interval` seconds and reloaded when
+they change on disk.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogs")
+DEFAULT_REGION = "default"
+PRICING_SECTIONS = ("vm_configs", "add_ons", "management", "bandwidth")
+
+logger = logging.getLogger(__name__)
+
+
+class Catalog(dict):
+    # The pricing sections as a plain dict, so a Catalog can be passed
+    # wherever a PRICING dict is expected, plus version metadata and a
+    # sorted vCPU tier index for O(log n) base VM selection
+    def __init__(self, data, path=None):
+        missing = [section for section in PRICING_SECTIONS if not isinstance(data.get(section), dict)]
+        if missing:
+            raise ValueError(f"{path or 'catalog'}: missing pricing sections {missing}")
+        for name, config in data["vm_configs"].items():
+            if not all(isinstance(config.get(key), int) for key in ("vCPU", "RAM", "Storage", "Price")):
+                raise ValueError(f"{path or 'catalog'}: vm_configs[{name!r}] needs integer vCPU, RAM, Storage and Price")
+        if not data["vm_configs"]:
+            raise ValueError(f"{path or 'catalog'}: vm_configs is empty")
+        super().__init__({section: data[section] for section in PRICING_SECTIONS})
+        self.region = str(data.get("region") or DEFAULT_REGION)
+        self.version = str(data.get("version") or "")
+        self.path = path
+        # Changes whenever any price changes, even if the version wasn't bumped
+        payload = json.dumps([self.region, self.version, self], sort_keys=True)
+        self.fingerprint = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+        # First config per distinct vCPU, matching get_base_vm()'s tie-breaking
+        first = {}
+        for name, config in data["vm_configs"].items():
+            first.setdefault(config["vCPU"], name)
+        self.tier_vcpus = sorted(first)
+        self.tier_names = [first[vcpu] for vcpu in self.tier_vcpus]
+        self.tier_configs = [data["vm_configs"][name] for name in self.tier_names]
+
+    def base_vm(self, user_vcpu):
+        # Largest tier with vCPU <= requested, else the smallest tier
+        return self.tier_configs[max(bisect_right(self.tier_vcpus, user_vcpu) - 1, 0)]
+
+    def __reduce__(self):
+        # Rebuild from the pricing sections when pickled to worker processes
+        return (Catalog, ({**self, "region": self.region, "version": self.version}, self.path))
+
+
+def load_catalog(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("region", os.path.basename(os.path.dirname(path)))
+    data.setdefault("version", os.path.splitext(os.path.basename(path))[0])
+    return Catalog(data, path)
+
+
+class CatalogRegistry:
+    def __init__(self, directory=CATALOG_DIR, check_interval=2.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._files = {}  # path -> (mtime, Catalog)
+        self._failed = {}  # path -> mtime of the last copy that failed to load
+        self._catalogs = {}  # (region, version) -> Catalog
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            files = {}
+            failed = {}
+            for region in sorted(os.listdir(self.directory)):
+                region_dir = os.path.join(self.directory, region)
+                if not os.path.isdir(region_dir):
+                    continue
+                try:
+                    names = sorted(os.listdir(region_dir))
+                except OSError:
+                    continue
+                for name in names:
+                    if not name.endswith(".json"):
+                        continue
+                    path = os.path.join(region_dir, name)
+                    try:
+                        mtime = os.stat(path).st_mtime_ns
+                    except OSError:
+                        # Deleted or renamed since the directory was listed
+                        continue
+                    cached = self._files.get(path)
+                    # A catalog being edited or copied in may be half-written;
+                    # keep serving the previous copy, or leave a new file out,
+                    # until it parses. One bad file never hides the others.
+                    try:
+                        files[path] = cached if cached and cached[0] == mtime else (mtime, load_catalog(path))
+                    except (OSError, ValueError) as e:
+                        if self._failed.get(path) != mtime:
+                            logger.warning("skipping price catalog %s: %s", path, e)
+                        failed[path] = mtime
+                        if cached is not None:
+                            files[path] = cached
+            self._files = files
+            self._failed = failed
+            self._catalogs = {(c.region, c.version): c for _, c in files.values()}
+
+    def versions(self, region=DEFAULT_REGION):
+        self.refresh()
+        return sorted(version for r, version in self._catalogs if r == region)
+
+    def get(self, region=None, version=None):
+        # Latest version of the region unless a specific version is asked for
+        self.refresh()
+        region = region or DEFAULT_REGION
+        versions = self.versions(region)
+        if not versions:
+            raise ValueError(f"no price catalog for region {region!r} in {self.directory}")
+        version = version or versions[-1]
+        try:
+            return self._catalogs[(region, version)]
+        except KeyError:
+            raise ValueError(f"no price catalog version {version!r} for region {region!r}, have {versions}") from None
+
+
+catalogs = CatalogRegistry()
+
+
+def get_catalog(region=None, version=None):
+    return catalogs.get(region, version)
@@ -0,0 +1,245 @@
+"""Per-stage timing, metrics and opt-in profiling for the quotation pipeline.
+
+Wrap a pipeline stage in `with stage("pdf.header"):` and its duration is
+  - observed in the quotation_stage_seconds histogram (and counted in
+    quotation_stage_errors_total if it raises), exposed in the Prometheus
+    text format by REGISTRY.expose(): GET /metrics on the API,
+    batch.py --metrics for the node_exporter textfile collector;
+  - logged as one JSON line on the "quotation.timing" logger at DEBUG. Set
+    QUOTE_LOG_TIMINGS=1 to send those lines to stderr without any logging
+    setup of your own.
+
+Stage names used: pricing, optimize, dataframes, styler, pdf.header,
+pdf.main_table, pdf.terms, pdf.table, pdf.summary, pdf.output, pdf.render,
+output.write, store.issue, sweep, request.price, request.pdf.
+
+profiled() captures a cProfile (or, if installed, pyinstrument) profile of
+one block, e.g. a single quotation request.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger("quotation.timing")
+if os.environ.get("QUOTE_LOG_TIMINGS"):
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.DEBUG)
+
+# Upper bounds in seconds, from sub-millisecond pricing to multi-second renders
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}" if labels else ""
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}  # sorted label pairs -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}  # sorted label pairs -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def summary(self):
+        # {label pairs: {"count", "sum", "p50", "p95"}}; quantiles are bucket
+        # upper bounds, as a Prometheus histogram_quantile() would see them
+        result = {}
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            counts = series[:-1]
+            count = sum(counts)
+            result[key] = {"count": count, "sum": series[-1], "p50": self._quantile(counts, count, 0.5), "p95": self._quantile(counts, count, 0.95)}
+        return result
+
+    def _quantile(self, counts, count, q):
+        seen = 0
+        for bound, n in zip((*self.buckets, float("inf")), counts):
+            seen += n
+            if seen >= q * count:
+                return bound
+        return float("inf")
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_text((*key, ('le', bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_label_text(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help):
+        metric = Counter(name, help)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, buckets=BUCKETS):
+        metric = Histogram(name, help, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        # Prometheus text exposition format (version 0.0.4)
+        return "\n".join(line for metric in self.metrics for line in metric.expose()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram("quotation_stage_seconds", "Time spent in each quotation pipeline stage.")
+STAGE_ERRORS = REGISTRY.counter("quotation_stage_errors_total", "Pipeline stages that raised, by exception type.")
+
+_local = threading.local()
+
+
+class stage:
+    # Times the block as pipeline stage `name`; extra keyword fields only go
+    # into the log line. A class rather than @contextmanager: it is entered
+    # once per row on the batch pricing path.
+    __slots__ = ("name", "fields", "start")
+
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.name, error=exc_type.__name__)
+        collected = getattr(_local, "collected", None)
+        if collected is not None:
+            collected.append((self.name, elapsed))
+        if logger.isEnabledFor(logging.DEBUG):
+            record = {"event": "stage", "stage": self.name, "ms": round(elapsed * 1000, 3), **self.fields}
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            logger.debug(json.dumps(record, default=str))
+        return False
+
+
+@contextmanager
+def collect_stages():
+    # Yields a list that receives (stage, seconds) for every stage finished
+    # in this thread inside the block, so worker processes can send their
+    # timings back to the parent with the result
+    previous = getattr(_local, "collected", None)
+    collected = _local.collected = []
+    try:
+        yield collected
+    finally:
+        _local.collected = previous
+        if previous is not None:
+            previous.extend(collected)
+
+
+def merge_stages(timings):
+    # Record timings collected in another process
+    for name, seconds in timings:
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def stage_summary():
+    # One row per stage: count, total and mean seconds, approximate p50/p95
+    rows = []
+    for key, values in sorted(STAGE_SECONDS.summary().items()):
+        labels = dict(key)
+        rows.append({
+            "stage": labels.get("stage", ""),
+            "count": values["count"],
+            "total_s": values["sum"],
+            "mean_ms": values["sum"] / values["count"] * 1000 if values["count"] else 0.0,
+            "p50_ms": values["p50"] * 1000,
+            "p95_ms": values["p95"] * 1000,
+        })
+    return rows
+
+
+# ---- Profiling ----
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+@contextmanager
+def profiled(profiler="cprofile", limit=40):
+    # Profile the block; the yielded dict gets a text "report" when it exits
+    # (plus "html" for pyinstrument). Profiles only the current thread.
+    result = {}
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("pyinstrument is not installed (pip install pyinstrument), use profiler='cprofile'") from None
+        instrument = Profiler()
+        instrument.start()
+        try:
+            yield result
+        finally:
+            instrument.stop()
+            result["report"] = instrument.output_text()
+            result["html"] = instrument.output_html()
+    elif profiler == "cprofile":
+        # Imported here: pstats alone would double the workers' start-up time
+        import cProfile
+        import io
+        import pstats
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield result
+        finally:
+            profile.disable()
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(limit)
+            result["report"] = out.getvalue()
+    else:
+        raise ValueError(f"profiler must be one of {PROFILERS}, got {profiler!r}")
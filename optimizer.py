@@ -0,0 +1,130 @@
+"""Cheapest-configuration search for a requested VM spec.
+
+get_base_vm() picks the largest tier whose vCPU fits and bolts add-ons on,
+ignoring RAM and storage. For RAM- or storage-heavy specs a larger tier, or
+several smaller VMs, is often cheaper. PriceOptimizer searches every tier
+(and optionally splits the spec across k identical smaller VMs) for the
+lowest monthly cost; optimize_spec() rewrites a normalized spec so the
+regular pricing path quotes the cheapest plan.
+
+Per-VM services (antivirus, backup, OS management) are not re-counted when
+a VM is split: the spec doesn't record which VMs a quantity covers, so the
+quantities stay as entered, and the search compares VM costs only.
+"""
+from catalog import get_catalog
+from pricing import find_base_vm, normalize_spec
+
+MAX_SPLIT = 8
+MEMO_SIZE = 100000
+
+
+class PriceOptimizer:
+    def __init__(self, pricing):
+        self.pricing = pricing
+        add_ons = pricing["add_ons"]
+        self.vcpu_price = add_ons["vcpu_unit_price"]
+        self.ram_price = add_ons["ram_per_gb"]
+        self.storage_price = add_ons["storage_per_50gb"]
+
+        # Precomputed tier table: drop tiers that another tier beats on every
+        # resource at no higher price (they can never be the cheapest), then
+        # sort by price so the search can stop at the first tier whose bare
+        # price already exceeds the best total found
+        configs = list(pricing["vm_configs"].items())
+        kept = []
+        for name, c in configs:
+            dominated = any(
+                o is not c and o["vCPU"] >= c["vCPU"] and o["RAM"] >= c["RAM"] and o["Storage"] >= c["Storage"]
+                and (o["Price"], o["vCPU"], o["RAM"], o["Storage"]) < (c["Price"], c["vCPU"], c["RAM"], c["Storage"])
+                for _, o in configs
+            )
+            if not dominated:
+                kept.append((c["Price"], c["vCPU"], c["RAM"], c["Storage"], name))
+        self.tiers = sorted(kept)
+        self._memo = {}
+
+    def vm_cost(self, config, vcpu, ram, storage):
+        # Same formula as pricing.price_vm()
+        return (
+            config["Price"]
+            + max(0, vcpu - config["vCPU"]) * self.vcpu_price
+            + max(0, ram - config["RAM"]) * self.ram_price
+            + ((max(0, storage - config["Storage"]) + 49) // 50) * self.storage_price
+        )
+
+    def best_tier(self, vcpu, ram, storage):
+        # (monthly cost, tier name) of the cheapest single VM for the spec.
+        # Ties keep the tier get_base_vm() would have picked.
+        key = (vcpu, ram, storage)
+        best = self._memo.get(key)
+        if best is not None:
+            return best
+        greedy = find_base_vm(self.pricing, vcpu)
+        best_cost = self.vm_cost(greedy, vcpu, ram, storage)
+        best_name = next(name for name, c in self.pricing["vm_configs"].items() if c is greedy)
+        for price, t_vcpu, t_ram, t_storage, name in self.tiers:
+            if price >= best_cost:
+                break
+            cost = (
+                price
+                + max(0, vcpu - t_vcpu) * self.vcpu_price
+                + max(0, ram - t_ram) * self.ram_price
+                + ((max(0, storage - t_storage) + 49) // 50) * self.storage_price
+            )
+            if cost < best_cost:
+                best_cost, best_name = cost, name
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        best = self._memo[key] = (best_cost, best_name)
+        return best
+
+    def optimize(self, vcpu, ram, storage, allow_split=False, max_split=MAX_SPLIT):
+        # Cheapest plan for one requested VM. With allow_split the spec may be
+        # served by k identical VMs of ceil(spec / k) each.
+        greedy = find_base_vm(self.pricing, vcpu)
+        greedy_cost = self.vm_cost(greedy, vcpu, ram, storage)
+        cost, tier = self.best_tier(vcpu, ram, storage)
+        plan = {"split": 1, "vcpu": vcpu, "ram": ram, "storage": storage, "tier": tier, "per_vm_cost": cost, "monthly_cost": cost}
+        if allow_split:
+            for k in range(2, max_split + 1):
+                sub = (-(-vcpu // k), -(-ram // k), -(-storage // k))
+                sub_cost, sub_tier = self.best_tier(*sub)
+                if sub_cost * k < plan["monthly_cost"]:
+                    plan = {"split": k, "vcpu": sub[0], "ram": sub[1], "storage": sub[2], "tier": sub_tier, "per_vm_cost": sub_cost, "monthly_cost": sub_cost * k}
+        plan["greedy_cost"] = greedy_cost
+        plan["savings"] = greedy_cost - plan["monthly_cost"]
+        return plan
+
+
+_optimizers = {}
+
+
+def optimizer_for(pricing=None):
+    # One optimizer (and memo table) per catalog version in this process
+    pricing = pricing or get_catalog()
+    key = getattr(pricing, "fingerprint", None) or id(pricing)
+    optimizer = _optimizers.get(key)
+    if optimizer is None or (key == id(pricing) and optimizer.pricing is not pricing):
+        optimizer = _optimizers[key] = PriceOptimizer(pricing)
+    return optimizer
+
+
+def optimize_spec(spec, pricing=None, allow_split=False, max_split=MAX_SPLIT):
+    # Rewrite each VM group of a normalized spec into its cheapest plan;
+    # returns (new spec, plans), one plan per group. A split multiplies the
+    # group's num_vms; antivirus, backup and os_qty are left unchanged.
+    pricing = pricing or get_catalog()
+    optimizer = optimizer_for(pricing)
+    groups, plans = [], []
+    for group in spec["vm_groups"]:
+        plan = optimizer.optimize(group["vcpu"], group["ram"], group["storage"], allow_split, max_split)
+        plans.append(plan)
+        groups.append({
+            "label": group["label"],
+            "num_vms": group["num_vms"] * plan["split"],
+            "vcpu": plan["vcpu"],
+            "ram": plan["ram"],
+            "storage": plan["storage"],
+            "tier": plan["tier"],
+        })
+    return normalize_spec(dict(spec, vm_groups=groups), pricing), plans
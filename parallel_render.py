@@ -0,0 +1,275 @@
+"""Process-pool rendering for bulk quotation runs.
+
+fpdf rendering is pure Python and single-core bound, so bulk runs fan the
+pricing + rendering of each row out across worker processes and collect the
+PDF bytes back in the parent, which writes them into a directory or a ZIP.
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from collections import deque
+
+from catalog import get_catalog
+from instrumentation import collect_stages, merge_stages, stage
+from pricing import normalize_spec, price_quotation
+
+
+def customer_info_from_row(row):
+    customer_info = {
+        "name": str(row.get("customer_name") or ""),
+        "address": str(row.get("customer_address") or ""),
+        "gstn": str(row.get("customer_gstn") or ""),
+        "email": str(row.get("customer_email") or ""),
+    }
+    quotation_info = {
+        "number": str(row.get("quotation_no") or ""),
+        "date": str(row.get("quotation_date") or time.strftime("%d-%m-%Y")),
+    }
+    return customer_info, quotation_info
+
+
+def pdf_filename(row, index):
+    number = re.sub(r"[^A-Za-z0-9._-]+", "_", str(row.get("quotation_no") or "")).strip("._")
+    return f"{number or f'quotation_{index:06d}'}.pdf"
+
+
+def quote_row(row, optimize=None):
+    # Price one input row; returns (quote, monthly savings or None). With
+    # `optimize` (a dict of optimize_spec() options) each VM group is quoted
+    # on its cheapest tier/split instead of the default vCPU-based tier.
+    # Rows may pin a region/catalog_version to re-price against an older price list.
+    catalog = get_catalog(row.get("region") or None, row.get("catalog_version") or None)
+    spec = normalize_spec(row, catalog)
+    monthly_savings = None
+    if optimize is not None:
+        from optimizer import optimize_spec
+        requested = spec["vm_groups"]
+        with stage("optimize"):
+            spec, plans = optimize_spec(spec, catalog, **optimize)
+        monthly_savings = sum(plan["savings"] * group["num_vms"] for plan, group in zip(plans, requested))
+    with stage("pricing"):
+        return price_quotation(spec, catalog), monthly_savings
+
+
+def render_row(row, optimize=None, itemized=False):
+    # Price and render one row; returns (quote, monthly savings, PDF bytes)
+    from quotation_pdf import render_quotation_bytes
+    quote, monthly_savings = quote_row(row, optimize)
+    customer_info, quotation_info = customer_info_from_row(row)
+    return quote, monthly_savings, render_quotation_bytes(quote, customer_info, quotation_info, itemized=itemized)
+
+
+def cached_render_row(row, pdf_cache, optimize=None, itemized=False):
+    # Like render_row(), but through a PDFCache: returns (quote, monthly
+    # savings, path of the cached PDF, cache hit)
+    from quotation_pdf import render_quotation_bytes
+    quote, monthly_savings = quote_row(row, optimize)
+    customer_info, quotation_info = customer_info_from_row(row)
+    key = pdf_cache.key(quote, customer_info, quotation_info, itemized)
+    path, hit = pdf_cache.get_or_render(key, lambda: render_quotation_bytes(quote, customer_info, quotation_info, itemized=itemized))
+    return quote, monthly_savings, path, hit
+
+
+def issue_row(row, store, optimize=None, render=True, itemized=False):
+    # Like render_row(), but records the quotation in a QuotationStore; a
+    # blank quotation_no takes the next number in the store's series.
+    # Returns (quote, monthly savings, PDF bytes or None, quotation number)
+    quote, monthly_savings = quote_row(row, optimize)
+    customer_info, quotation_info = customer_info_from_row(row)
+
+    def render_pdf(quotation_info):
+        from quotation_pdf import render_quotation_bytes
+        return render_quotation_bytes(quote, customer_info, quotation_info, itemized=itemized)
+
+    inputs = {"spec": quote["spec"], "itemized": itemized}
+    issued = store.issue(quote, customer_info, quotation_info, inputs=inputs, render=render_pdf if render else None)
+    return quote, monthly_savings, issued["pdf"], issued["number"]
+
+
+def render_job(job, render=True, optimize=None, pdf_cache=None, store=None):
+    # A job is an (index, row) pair. Any failure is captured on the result
+    # instead of raised, so one bad row doesn't kill the whole run. With a
+    # pdf_cache the PDF stays on disk and only its path comes back. With a
+    # QuotationStore the row is recorded in it, and comes back with the
+    # quotation number it was issued under. The row's stage timings travel
+    # back too, for workers in other processes.
+    index, row = job
+    result = {
+        "index": index, "row": row, "filename": None, "quote": None, "pdf": None,
+        "pdf_file": None, "cache_hit": False, "error": None, "monthly_savings": None, "timings": None,
+    }
+    with collect_stages() as timings:
+        try:
+            # A row the reader couldn't parse arrives as its exception
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError(f"a row must be an object of quotation fields, got {type(row).__name__}")
+            result["filename"] = pdf_filename(row, index)
+            if store is not None:
+                result["quote"], result["monthly_savings"], result["pdf"], number = issue_row(row, store, optimize, render)
+                result["row"] = row = dict(row, quotation_no=number)
+                result["filename"] = pdf_filename(row, index)
+            elif not render:
+                result["quote"], result["monthly_savings"] = quote_row(row, optimize)
+            elif pdf_cache is not None:
+                result["quote"], result["monthly_savings"], result["pdf_file"], result["cache_hit"] = cached_render_row(row, pdf_cache, optimize)
+            else:
+                result["quote"], result["monthly_savings"], result["pdf"] = render_row(row, optimize)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["timings"] = timings
+    return result
+
+
+def _render_chunk(chunk, render, optimize, pdf_cache, store):
+    return [render_job(job, render, optimize, pdf_cache, store) for job in chunk]
+
+
+def _chunks(jobs, chunksize):
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_render(jobs, workers=None, chunksize=16, ordered=True, render=True, optimize=None, pdf_cache=None, store=None):
+    # Yields one result per job. Only a bounded window of chunks is in flight
+    # at a time, so arbitrarily long job iterators don't pile up in memory.
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for job in jobs:
+            yield render_job(job, render, optimize, pdf_cache, store)
+        return
+
+    # Imported here: multiprocessing costs a single-process run for nothing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = _chunks(jobs, chunksize)
+        max_in_flight = workers * 2
+        pending = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    pending.append(executor.submit(_render_chunk, chunk, render, optimize, pdf_cache, store))
+            if not pending:
+                break
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                for result in future.result():
+                    # Stages ran in the worker, so record them here as well
+                    merge_stages(result["timings"])
+                    yield result
+
+
+# ---- Output Sinks ----
+# Read once: os.umask() can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_atomic(path, data):
+    # Write `data` to a temporary file and rename it over `path`, so readers
+    # never see a partial file. mkstemp() creates it owner-only; it gets the
+    # mode a plain open() would have given it instead.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o666 & ~_UMASK)
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+class DirectorySink:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.filenames = set()  # written in this run, lower-cased
+        os.makedirs(out_dir, exist_ok=True)
+
+    def write(self, filename, data):
+        # Replaced rather than opened in place: the path may be a hard link
+        # into the PDF cache from an earlier --pdf-cache run, whose content
+        # must not change
+        return write_atomic(os.path.join(self.out_dir, filename), data)
+
+    def write_file(self, filename, source):
+        # Hard-link an existing PDF (e.g. from the PDF cache) into place,
+        # copying when the two directories are on different filesystems
+        path = os.path.join(self.out_dir, filename)
+        if os.path.lexists(path):
+            os.unlink(path)
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+        return path
+
+    def close(self):
+        pass
+
+
+class ZipSink:
+    # PDF bytes go straight into the archive, no intermediate files. `target`
+    # is a path or a writable binary file object; non-seekable streams such
+    # as stdout or an HTTP response body work too.
+    def __init__(self, target):
+        self.name = target if isinstance(target, (str, os.PathLike)) else getattr(target, "name", "zip")
+        self.zf = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+        self.filenames = set()  # written in this run, lower-cased
+
+    def write(self, filename, data):
+        self.zf.writestr(filename, data)
+        return f"{self.name}:{filename}"
+
+    def write_file(self, filename, source):
+        self.zf.write(source, filename)
+        return f"{self.name}:{filename}"
+
+    def close(self):
+        self.zf.close()
+
+
+def unique_filename(used, filename, index):
+    # Two rows with the same quotation_no would otherwise write the same
+    # file (or duplicate ZIP entries): the first keeps the name, later ones
+    # get their row number appended. Compared case-insensitively, as on
+    # Windows and macOS file systems.
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 1
+    while candidate.lower() in used:
+        candidate = f"{stem}_row{index}{ext}" if n == 1 else f"{stem}_row{index}_{n}{ext}"
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_result(sink, result):
+    # Put a rendered result's PDF into `sink`, from bytes or a cached file;
+    # returns where it went, or None if there was nothing to write
+    if result["pdf_file"] is None and result["pdf"] is None:
+        return None
+    result["filename"] = unique_filename(sink.filenames, result["filename"], result["index"])
+    if result["pdf_file"] is not None:
+        return sink.write_file(result["filename"], result["pdf_file"])
+    return sink.write(result["filename"], result["pdf"])
+
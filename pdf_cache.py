@@ -0,0 +1,97 @@
+"""Content-addressed on-disk cache of rendered quotation PDFs.
+
+A renewal batch is mostly quotations that haven't changed since the last
+run. Each rendered PDF is stored under a hash of everything that shows up in
+it: the normalized spec, customer and quotation details, the price catalog
+fingerprint (which changes with any price, not just the version name) and
+the PDF template version. A later run with the same inputs gets the cached
+file back, which batch output directories hard-link instead of copying.
+
+Entries are plain files in <cache dir>/<2 hex>/<hash>.pdf, written
+atomically, so concurrent worker processes can share one cache directory.
+Hits refresh the file's mtime and evict() drops the least recently used
+files until the cache fits in `max_bytes`.
+"""
+import os
+
+from catalog import get_catalog
+from parallel_render import write_atomic
+from quotation_pdf import TEMPLATE_VERSION
+from quote_cache import canonical_key
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+class PDFCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, quote, customer_info, quotation_info, itemized=False):
+        catalog = get_catalog(quote.get("region"), quote.get("catalog_version"))
+        return canonical_key("pdf", TEMPLATE_VERSION, catalog.fingerprint, quote["spec"], customer_info, quotation_info, itemized)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def get(self, key):
+        # Path of the cached PDF, or None
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        # Store `data` under `key` and return its path. Written to a temporary
+        # file and renamed into place, so readers never see a partial PDF.
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return write_atomic(path, data)
+
+    def get_or_render(self, key, render):
+        # Returns (path, hit); render() is only called on a miss
+        path = self.get(key)
+        if path is not None:
+            return path, True
+        return self.put(key, render()), False
+
+    def entries(self):
+        # (mtime, size, path) of every cached PDF
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        # Drop least recently used PDFs until the cache fits in max_bytes;
+        # returns (files removed, bytes freed). Files hard-linked into output
+        # directories keep their content, only the cache's link goes away.
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def stats(self):
+        entries = self.entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes}
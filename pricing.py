@@ -0,0 +1,326 @@
+"""Pricing engine for VM hosting quotations.
+
+Pure-Python so it can be imported by the Streamlit app, the batch CLI and
+worker processes alike. Every function takes the price list as `pricing`
+(a catalog.Catalog or a dict with the same sections) and defaults to the
+current catalog.
+"""
+import json
+
+from catalog import get_catalog
+
+IGST_RATE = 0.18
+
+# Quotation inputs, named after the Streamlit widget keys, with their defaults
+SPEC_DEFAULTS = {
+    "num_vms": 1,
+    "vcpu": 1,
+    "ram": 1,
+    "storage": 1,
+    "antivirus": 0,
+    "backup": 0,
+    "db": 0,
+    "os_type": "linux",
+    "os_qty": 0,
+    "bandwidth": "Default",
+    "discount": 0,
+}
+GROUP_FIELDS = ("num_vms", "vcpu", "ram", "storage")
+DEFAULT_GROUP_LABEL = "App server"
+CUSTOMER_FIELDS = ("customer_name", "customer_address", "customer_gstn", "customer_email", "quotation_no", "quotation_date")
+
+
+def _as_int(spec, key, minimum):
+    value = spec.get(key)
+    if value is None or value == "":
+        value = SPEC_DEFAULTS[key]
+    # int() would quietly truncate 4.7 (from JSON input) to 4
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{key} must be a whole number, got {value!r}")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a whole number, got {value!r}")
+    if value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}, got {value}")
+    return value
+
+
+def normalize_vm_group(raw, pricing):
+    group = {field: _as_int(raw, field, 1) for field in GROUP_FIELDS}
+    group["label"] = str(raw.get("label") or DEFAULT_GROUP_LABEL).strip()
+    # An explicit base tier (e.g. picked by the optimizer) overrides the
+    # default vCPU-based selection
+    tier = raw.get("tier")
+    if tier:
+        if tier not in pricing["vm_configs"]:
+            raise ValueError(f"tier must be one of {list(pricing['vm_configs'])}, got {tier!r}")
+        group["tier"] = tier
+    return group
+
+
+def normalize_spec(raw, pricing=None):
+    # Apply the same defaults and limits as the Streamlit widgets, so a spec
+    # coming from a CSV/JSON row prices exactly like one entered in the UI.
+    # A quotation covers one VM group given by the top-level num_vms/vcpu/
+    # ram/storage, or several given as a `vm_groups` list (a JSON string is
+    # accepted too, for CSV input).
+    pricing = pricing or get_catalog()
+    vm_groups = raw.get("vm_groups") or []
+    if isinstance(vm_groups, str):
+        try:
+            vm_groups = json.loads(vm_groups)
+        except ValueError:
+            raise ValueError(f"vm_groups must be a JSON list, got {vm_groups!r}")
+    if not isinstance(vm_groups, list) or not all(isinstance(g, dict) for g in vm_groups):
+        raise ValueError("vm_groups must be a list of objects with num_vms, vcpu, ram, storage")
+    vm_groups = [normalize_vm_group(g, pricing) for g in vm_groups] or [normalize_vm_group(raw, pricing)]
+
+    # Top-level VM fields mirror the first group, num_vms counts the whole estate
+    spec = {field: vm_groups[0][field] for field in GROUP_FIELDS}
+    spec["num_vms"] = sum(g["num_vms"] for g in vm_groups)
+    spec.update({
+        "antivirus": _as_int(raw, "antivirus", 0),
+        "backup": _as_int(raw, "backup", 0),
+        "db": _as_int(raw, "db", 0),
+        "os_qty": _as_int(raw, "os_qty", 0),
+        "discount": _as_int(raw, "discount", 0),
+    })
+    if spec["antivirus"] > spec["num_vms"]:
+        raise ValueError(f"antivirus ({spec['antivirus']}) cannot exceed num_vms ({spec['num_vms']})")
+    if spec["backup"] > spec["num_vms"]:
+        raise ValueError(f"backup ({spec['backup']}) cannot exceed num_vms ({spec['num_vms']})")
+    if spec["discount"] > 100:
+        raise ValueError(f"discount must be between 0 and 100, got {spec['discount']}")
+    os_type = str(raw.get("os_type") or SPEC_DEFAULTS["os_type"]).strip().lower()
+    if os_type not in ("linux", "windows"):
+        raise ValueError(f"os_type must be 'linux' or 'windows', got {os_type!r}")
+    spec["os_type"] = os_type
+    bandwidth = str(raw.get("bandwidth") or SPEC_DEFAULTS["bandwidth"]).strip()
+    if bandwidth not in pricing["bandwidth"]:
+        raise ValueError(f"bandwidth must be one of {list(pricing['bandwidth'])}, got {bandwidth!r}")
+    spec["bandwidth"] = bandwidth
+    spec["vm_groups"] = vm_groups
+    return spec
+
+
+# ---- Cost Calculation ----
+def get_base_vm(vm_configs, user_vcpu):
+    valid = [v for v in vm_configs.values() if v["vCPU"] <= user_vcpu]
+    return max(valid, key=lambda x: x["vCPU"]) if valid else min(vm_configs.values(), key=lambda x: x["vCPU"])
+
+
+def find_base_vm(pricing, user_vcpu):
+    # Catalogs carry a sorted tier index; plain dicts fall back to a scan
+    if hasattr(pricing, "base_vm"):
+        return pricing.base_vm(user_vcpu)
+    return get_base_vm(pricing["vm_configs"], user_vcpu)
+
+
+def price_vm(user_vcpus, user_ram, user_storage, num_vms, pricing=None, base_vm=None):
+    pricing = pricing or get_catalog()
+    base_vm = base_vm or find_base_vm(pricing, user_vcpus)
+    extra_vcpu = max(0, user_vcpus - base_vm["vCPU"])
+    extra_ram = max(0, user_ram - base_vm["RAM"])
+    extra_storage = max(0, user_storage - base_vm["Storage"])
+
+    vcpu_cost = extra_vcpu * pricing["add_ons"]["vcpu_unit_price"]
+    ram_cost = extra_ram * pricing["add_ons"]["ram_per_gb"]
+    storage_cost = ((extra_storage + 49) // 50) * pricing["add_ons"]["storage_per_50gb"]
+    per_vm_cost = base_vm["Price"] + vcpu_cost + ram_cost + storage_cost
+    total_vm_monthly = per_vm_cost * num_vms
+    return {
+        "base_vm": base_vm,
+        "extra_vcpu": extra_vcpu,
+        "extra_ram": extra_ram,
+        "extra_storage": extra_storage,
+        "vcpu_cost": vcpu_cost,
+        "ram_cost": ram_cost,
+        "storage_cost": storage_cost,
+        "per_vm_cost": per_vm_cost,
+        "total_vm_monthly": total_vm_monthly,
+        "total_vm_annual": total_vm_monthly * 12,
+    }
+
+
+def management_price_key(os_type):
+    return "os_management_linux" if os_type == "linux" else "os_management_windows"
+
+
+def price_management(antivirus_qty, os_type, os_qty, backup_qty, db_qty, pricing=None):
+    pricing = pricing or get_catalog()
+    antivirus_cost = antivirus_qty * pricing["management"]["antivirus"]
+    os_cost = os_qty * pricing["management"][management_price_key(os_type)]
+    backup_cost = backup_qty * pricing["management"]["backup_management"]
+    db_cost = db_qty * pricing["management"]["database_management"]
+    mgmt_monthly = antivirus_cost + os_cost + backup_cost + db_cost
+    return {
+        "antivirus_cost": antivirus_cost,
+        "os_cost": os_cost,
+        "backup_cost": backup_cost,
+        "db_cost": db_cost,
+        "mgmt_monthly": mgmt_monthly,
+        "mgmt_annual": mgmt_monthly * 12,
+    }
+
+
+def price_quotation(spec, pricing=None):
+    pricing = pricing or get_catalog()
+    # `spec` is expected to have gone through normalize_spec(). The quote
+    # records the catalog it was priced against so it can be reproduced.
+    quote = {"spec": spec, "region": getattr(pricing, "region", None), "catalog_version": getattr(pricing, "version", None)}
+    groups = []
+    for group in spec["vm_groups"]:
+        base_vm = pricing["vm_configs"][group["tier"]] if group.get("tier") else None
+        priced = price_vm(group["vcpu"], group["ram"], group["storage"], group["num_vms"], pricing, base_vm)
+        priced["group"] = group
+        groups.append(priced)
+    # Single-group quotations keep the per-VM figures at the top level
+    if len(groups) == 1:
+        quote.update({key: value for key, value in groups[0].items() if key != "group"})
+    quote["vm_groups"] = groups
+    quote["total_vm_monthly"] = sum(g["total_vm_monthly"] for g in groups)
+    quote["total_vm_annual"] = sum(g["total_vm_annual"] for g in groups)
+    quote.update(price_management(spec["antivirus"], spec["os_type"], spec["os_qty"], spec["backup"], spec["db"], pricing))
+
+    bandwidth_cost = pricing["bandwidth"][spec["bandwidth"]]
+    discount_percent = spec["discount"]
+    recurring_annual = quote["total_vm_annual"] + quote["mgmt_annual"]
+    discount_amt = recurring_annual * (discount_percent / 100)
+    final_total = (recurring_annual + bandwidth_cost - discount_amt)
+
+    # Final quotation amount is the taxable value; grand total adds 18% IGST
+    tax = round(final_total * IGST_RATE, 2)
+    quote.update({
+        "bandwidth_cost": bandwidth_cost,
+        "discount_percent": discount_percent,
+        "discount_amt": discount_amt,
+        "final_total": final_total,
+        "tax": tax,
+        "grand_total": final_total + tax,
+    })
+    return quote
+
+
+# ---- Table Rows ----
+def quote_catalog(quote):
+    # The catalog a quote was priced against, for the unit prices in its tables
+    return get_catalog(quote.get("region"), quote.get("catalog_version"))
+
+
+def vm_table_rows(quote, pricing=None):
+    pricing = pricing or quote_catalog(quote)
+    rows = []
+    for priced in quote["vm_groups"]:
+        rows.extend(vm_group_table_rows(priced, pricing, labelled=len(quote["vm_groups"]) > 1))
+    return rows
+
+
+def vm_group_table_rows(priced, pricing, labelled=False):
+    num_vms = priced["group"]["num_vms"]
+    base_vm = priced["base_vm"]
+    prefix = f"{priced['group']['label']}: " if labelled else ""
+    rows = [
+        {
+            "Item/Specification": f"{prefix}{base_vm['vCPU']}vCPU {base_vm['RAM']}GB {base_vm['Storage']}GB",
+            "Qty": num_vms,
+            "Unit Monthly Price": base_vm["Price"],
+            "Total Monthly Price": base_vm["Price"] * num_vms,
+            "Total Annual Price": base_vm["Price"] * num_vms * 12,
+        }
+    ]
+    # Add extra rows for additional requirements if any
+    if priced["extra_vcpu"] > 0:
+        rows.append({
+            "Item/Specification": f"{prefix}Extra vCPU x{priced['extra_vcpu']}",
+            "Qty": num_vms,
+            "Unit Monthly Price": pricing["add_ons"]["vcpu_unit_price"],
+            "Total Monthly Price": priced["vcpu_cost"],
+            "Total Annual Price": priced["vcpu_cost"] * 12,
+        })
+    if priced["extra_ram"] > 0:
+        rows.append({
+            "Item/Specification": f"{prefix}Extra RAM x{priced['extra_ram']}GB",
+            "Qty": num_vms,
+            "Unit Monthly Price": pricing["add_ons"]["ram_per_gb"],
+            "Total Monthly Price": priced["ram_cost"],
+            "Total Annual Price": priced["ram_cost"] * 12,
+        })
+    if priced["extra_storage"] > 0:
+        rows.append({
+            "Item/Specification": f"{prefix}Extra Storage x{priced['extra_storage']}GB",
+            "Qty": num_vms,
+            "Unit Monthly Price": pricing["add_ons"]["storage_per_50gb"],
+            "Total Monthly Price": priced["storage_cost"],
+            "Total Annual Price": priced["storage_cost"] * 12,
+        })
+    return rows
+
+
+def management_table_rows(quote, pricing=None):
+    pricing = pricing or quote_catalog(quote)
+    spec = quote["spec"]
+    os_type = spec["os_type"]
+    return [
+        {"Item/Specification": "Antivirus", "Qty": spec["antivirus"], "Unit Monthly Price": pricing["management"]["antivirus"], "Total Monthly Price": quote["antivirus_cost"], "Total Annual Price": quote["antivirus_cost"] * 12},
+        {"Item/Specification": f"OS Mgmt ({os_type})", "Qty": spec["os_qty"], "Unit Monthly Price": pricing["management"][management_price_key(os_type)], "Total Monthly Price": quote["os_cost"], "Total Annual Price": quote["os_cost"] * 12},
+        {"Item/Specification": "Backup", "Qty": spec["backup"], "Unit Monthly Price": pricing["management"]["backup_management"], "Total Monthly Price": quote["backup_cost"], "Total Annual Price": quote["backup_cost"] * 12},
+        {"Item/Specification": "Database Mgmt", "Qty": spec["db"], "Unit Monthly Price": pricing["management"]["database_management"], "Total Monthly Price": quote["db_cost"], "Total Annual Price": quote["db_cost"] * 12},
+    ]
+
+
+def summary_rows(quote):
+    spec = quote["spec"]
+    summary = [
+        {"Description": "Total Recurring (Infra + Mgmt)", "Amount (INR)": f"INR {(quote['total_vm_annual'] + quote['mgmt_annual']):,.0f}"},
+        {"Description": f"Bandwidth ({spec['bandwidth']})", "Amount (INR)": f"INR {quote['bandwidth_cost']:,.0f}"},
+    ]
+    if quote["discount_percent"] > 0:
+        summary.append({"Description": f"Discount ({quote['discount_percent']}%)", "Amount (INR)": f"-INR {quote['discount_amt']:,.0f}"})
+    summary.append({"Description": "Final Quotation", "Amount (INR)": f"INR {quote['final_total']:,.0f}"})
+    return summary
+
+
+def _main_row(items_services, qty, unit_price, taxable_value):
+    return {
+        "items_services": items_services,
+        "item_description": items_services,
+        "qty": qty,
+        "unit_price": unit_price,
+        "taxable_value": taxable_value,
+        "tax": float(round(taxable_value * IGST_RATE, 2)),
+    }
+
+
+def main_table_rows(quote, itemized=False, pricing=None):
+    pricing = pricing or quote_catalog(quote)
+    # A single-group quotation is one consolidated row; several VM groups (or
+    # itemized=True) get one row per VM group, management service, bandwidth
+    # and discount, whose taxable values add up to the final quotation amount
+    spec = quote["spec"]
+    if not itemized and len(quote["vm_groups"]) == 1:
+        items_services = f"App server {spec['vcpu']}vCPU {spec['ram']}GB RAM {spec['storage']}GB Storage, Antivirus, OS Managemnt({spec['os_type'].title()}), Backup Management"
+        return [{
+            "items_services": items_services,
+            "item_description": items_services,
+            "qty": spec["num_vms"],
+            "unit_price": quote["per_vm_cost"],
+            "taxable_value": quote["final_total"],  # Use final quotation amount as taxable value
+            "tax": float(quote["tax"]),  # Ensure this is always a float
+        }]
+
+    rows = []
+    for priced in quote["vm_groups"]:
+        group = priced["group"]
+        rows.append(_main_row(
+            f"{group['label']} {group['vcpu']}vCPU {group['ram']}GB RAM {group['storage']}GB Storage",
+            group["num_vms"], priced["per_vm_cost"], priced["total_vm_annual"],
+        ))
+    for row in management_table_rows(quote, pricing):
+        if row["Qty"] > 0:
+            rows.append(_main_row(row["Item/Specification"], row["Qty"], row["Unit Monthly Price"], row["Total Annual Price"]))
+    if quote["bandwidth_cost"] > 0:
+        rows.append(_main_row(f"Bandwidth ({spec['bandwidth']})", 1, quote["bandwidth_cost"], quote["bandwidth_cost"]))
+    if quote["discount_amt"] > 0:
+        rows.append(_main_row(f"Discount ({quote['discount_percent']}%)", 1, -quote["discount_amt"], -quote["discount_amt"]))
+    return rows
@@ -0,0 +1,416 @@
+import os
+
+from fpdf import FPDF
+
+from amount_words import amount_in_words
+from instrumentation import stage
+from pricing import vm_table_rows, management_table_rows, summary_rows, main_table_rows
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "phoneme_logo.png")
+# Bump whenever the rendered layout or static text changes, so cached PDFs
+# (pdf_cache.py) from the old template are not served again
+TEMPLATE_VERSION = "2026.10.1"
+
+# ---- Static Assets ----
+COMPANY_NAME = "PHONEME SOLUTIONS PRIVATE LIMITED"
+COMPANY_ADDRESS = "B-614 6TH FLOOR TOWER B PLOT NO 7\nNoida Pincode 201305\nNoida, 9 201305\nGSTN: 09AAHCP9748G2ZS"
+TERMS_TITLE = "Terms & Conditions"
+TERMS_TEXT = "Validity: This quotation is valid for 15 days from the date of issue. This is computer generated Quotation Signature is not required"
+
+# Decoded raster images, keyed by path, shared by every PDF in the process
+_image_cache = {}
+
+
+def cached_image_info(path):
+    info = _image_cache.get(path)
+    if info is None:
+        _, _, info = FPDF().preload_image(path)
+        _image_cache[path] = info
+    return info
+
+
+class PDF(FPDF):
+    # Reuse decoded images across instances instead of re-reading them per document
+    use_asset_cache = True
+
+    def header(self):
+        pass  # We'll use a custom header method for the quotation
+
+    def load_cached_image(self, path):
+        # Seed this document's image cache with the process-wide decoded copy
+        # so self.image() skips reading and decoding the file. Each document
+        # gets its own shallow copy, as output() records object ids on it.
+        # Images with an ICC profile need per-document profile bookkeeping
+        # and are left to fpdf. This relies on fpdf2 internals (image_cache,
+        # the "i"/"usages" keys), hence the 2.8.x pin in requirements.txt.
+        images = self.image_cache.images
+        if path in images:
+            return
+        info = cached_image_info(path)
+        if info.get("iccp") is not None:
+            return
+        info = type(info)(info)
+        info["i"] = len(images) + 1
+        info["usages"] = 0
+        images[path] = info
+
+    def quotation_header(self, logo_path, customer_info, quotation_info):
+        # --- Main Heading: Quotation ---
+        self.set_font("Arial", "BU", 18)  # Underline
+        self.cell(0, 16, "Quotation", ln=True, align="C")
+        self.ln(2)
+
+        y_start = self.get_y() + 2
+        x_left = self.l_margin
+        x_right = x_left + 70  # Enough space for logo + phoneme info
+
+        # --- Left: Phoneme logo and info ---
+        self.set_xy(x_left, y_start)
+        if self.use_asset_cache:
+            self.load_cached_image(logo_path)
+        self.image(logo_path, x=x_left, y=y_start, w=40)
+        self.set_xy(x_left, y_start + 20)
+        self.set_font("Arial", "B", 10)
+        self.multi_cell(60, 6, COMPANY_NAME, 0)
+        self.set_font("Arial", "", 9)
+        self.multi_cell(60, 5, COMPANY_ADDRESS, 0)
+        y_left_end = self.get_y()
+
+        # --- Right: Customer info ---
+        self.set_xy(x_right, y_start + 20)
+        self.set_font("Arial", "B", 10)
+        self.multi_cell(80, 6, customer_info['name'], 0)
+        self.set_x(x_right)  # Reset X after multi_cell
+        self.set_font("Arial", "", 9)
+        self.multi_cell(80, 5, customer_info['address'], 0)
+        self.set_x(x_right)  # Reset X after multi_cell
+        if customer_info.get('email'):
+            self.cell(80, 5, f"Email: {customer_info['email']}", ln=1)
+            self.set_x(x_right)
+        if customer_info.get('gstn'):
+            self.cell(80, 5, f"GSTN: {customer_info['gstn']}", ln=1)
+            self.set_x(x_right)
+        y_right_end = self.get_y()
+
+        # --- Below both: Quotation No. and Date ---
+        self.set_y(max(y_left_end, y_right_end) + 5)
+        self.set_font("Arial", "B", 10)
+        self.cell(40, 6, "Quotation No:", 0, 0)
+        self.set_font("Arial", "", 10)
+        self.cell(40, 6, quotation_info['number'], 0, 0)
+        self.set_font("Arial", "B", 10)
+        self.cell(40, 6, "Quotation Date:", 0, 0)
+        self.set_font("Arial", "", 10)
+        self.cell(40, 6, quotation_info['date'], 0, 1)
+        self.ln(5)
+
+    def add_terms_and_conditions(self):
+        self.set_y(-40)
+        self.set_font("Arial", "B", 10)
+        self.cell(0, 8, TERMS_TITLE, ln=True, align="C")
+        self.set_font("Arial", "", 10)
+        self.cell(0, 7, TERMS_TEXT, ln=True, align="C")
+
+    def table(self, title, data):
+        self.set_font("Arial", "B", 12)
+        self.cell(0, 10, title, ln=True)
+        self.set_font("Arial", "B", 10)
+
+        # Stringify once, reading rows as plain tuples rather than a Series each
+        columns, rows = table_data(data)
+        columns = [str(col) for col in columns]
+        rows = [[str(val) for val in row] for row in rows]
+
+        # Dynamically calculate column widths
+        table_width = self.w - 2 * self.l_margin
+        col_widths = []
+        min_col_width = 20
+        max_col_width = 60
+        total_width = 0
+        for i, col in enumerate(columns):
+            max_content_width = max(
+                [self.text_width(col)] + [self.text_width(row[i]) for row in rows]
+            ) + 6  # padding
+            col_width = min(max(max_content_width, min_col_width), max_col_width)
+            col_widths.append(col_width)
+            total_width += col_width
+        # Scale widths if total exceeds table width
+        if total_width > table_width:
+            scale = table_width / total_width
+            col_widths = [w * scale for w in col_widths]
+
+        # Header
+        self.table_header(columns, col_widths)
+
+        # Rows
+        for row in rows:
+            # Wrap every cell once; the tallest cell sets the row height
+            cell_lines = [self.split_lines(col_widths[i], val) for i, val in enumerate(row)]
+            row_height = 5 * max(len(lines) for lines in cell_lines)
+            # Rows never straddle pages; repeat the header on each new page
+            if self.ensure_space(row_height):
+                self.table_header(columns, col_widths)
+            x_start = self.get_x()
+            y_start = self.get_y()
+            x = x_start
+            for width, lines in zip(col_widths, cell_lines):
+                # Border the full row height so wrapped rows stay aligned
+                self.rect(x, y_start, width, row_height)
+                for n, line in enumerate(lines):
+                    self.set_xy(x, y_start + 5 * n)
+                    self.cell(width, 5, line, border=0, align="L")
+                x += width
+            self.set_xy(x_start, y_start)
+            self.ln(row_height)
+        self.ln(5)
+
+    def table_header(self, columns, col_widths):
+        self.set_font("Arial", "B", 10)
+        for i, col in enumerate(columns):
+            self.cell(col_widths[i], 8, str(col), border=1, align="C")
+        self.ln()
+        self.set_font("Arial", "", 9)
+
+    def simple_table(self, data):
+        self.set_font("Arial", "B", 12)
+        self.cell(0, 10, "Final Summary", ln=True)
+        self.set_font("Arial", "", 10)
+
+        columns, rows = table_data(data)
+        for row in (dict(zip(columns, values)) for values in rows):
+            self.cell(100, 8, str(row['Description']), border=1)
+            self.cell(60, 8, str(row['Amount (INR)']), border=1)
+            self.ln()
+        self.ln(5)
+
+    # ---- Text Layout ----
+    # Widths come straight from the core font's glyph width table instead of
+    # get_string_width(), which runs every call through text shaping. Widths
+    # are memoized per distinct string and wrapped lines per (string, width),
+    # keyed on the font; shared across instances so bulk runs reuse layouts.
+    _width_cache = {}
+    _split_cache = {}
+    LAYOUT_CACHE_SIZE = 10000
+
+    def text_width(self, text):
+        key = (self.font_family, self.font_style, self.font_size_pt, text)
+        width = PDF._width_cache.get(key)
+        if width is None:
+            glyph_widths = getattr(self.current_font, "cw", None)
+            try:
+                if not isinstance(glyph_widths, dict) or self.font_stretching != 100 or self.char_spacing:
+                    raise KeyError
+                width = sum(glyph_widths[char] for char in text) * self.font_size / 1000
+            except KeyError:
+                width = self.get_string_width(text)
+            if len(PDF._width_cache) >= PDF.LAYOUT_CACHE_SIZE:
+                PDF._width_cache.clear()
+            PDF._width_cache[key] = width
+        return width
+
+    def split_lines(self, width, text):
+        key = (self.font_family, self.font_style, self.font_size_pt, round(width, 3), text)
+        lines = PDF._split_cache.get(key)
+        if lines is None:
+            if len(PDF._split_cache) >= PDF.LAYOUT_CACHE_SIZE:
+                PDF._split_cache.clear()
+            lines = PDF._split_cache[key] = self.wrap_text(width, text)
+        return lines
+
+    def wrap_text(self, width, text):
+        # Greedy word wrap into a cell of `width` (inside the cell margins),
+        # breaking inside a word only when it doesn't fit on a line of its own;
+        # the same breaks multi_cell() makes for plain text
+        max_width = width - 2 * self.c_margin
+        space_width = self.text_width(" ")
+        lines = []
+        for paragraph in text.split("\n"):
+            line, line_width = [], 0
+            for word in paragraph.split(" "):
+                word_width = self.text_width(word)
+                if line and line_width + space_width + word_width > max_width:
+                    lines.append(" ".join(line))
+                    line, line_width = [], 0
+                if word_width > max_width:
+                    chars, word_width = "", 0
+                    for char in word:
+                        char_width = self.text_width(char)
+                        if chars and word_width + char_width > max_width:
+                            lines.append(chars)
+                            chars, word_width = "", 0
+                        chars += char
+                        word_width += char_width
+                    word = chars
+                line_width = line_width + space_width + word_width if line else word_width
+                line.append(word)
+            lines.append(" ".join(line))
+        # multi_cell() doesn't open a line for trailing whitespace
+        if len(lines) > 1 and not lines[-1]:
+            lines.pop()
+        return lines
+
+    def ensure_space(self, height):
+        # Start a new page if a block of `height` would cross the page break;
+        # returns True when a page was added
+        if self.get_y() + height > self.page_break_trigger:
+            self.add_page()
+            return True
+        return False
+
+    def main_quotation_header(self, headers, col_widths):
+        self.set_font("Arial", "B", 10)
+        for i, h in enumerate(headers):
+            self.cell(col_widths[i], 8, h, border=1, align="C")
+        self.ln()
+        self.set_font("Arial", "", 8)  # Use a smaller font for table rows
+
+    def main_quotation_table(self, data, grand_total, tax, amount_words):
+        headers = ["S. No.", "Items/Services", "Qty", "Unit Price", "Taxable Value", "Tax", "Subtotal"]
+        # Calculate available table width
+        table_width = self.w - 2 * self.l_margin
+        # Relative proportions for each column (adjust as needed)
+        col_props = [1, 3.5, 1, 1.5, 2, 2.7, 2]
+        total_props = sum(col_props)
+        col_widths = [table_width * (prop / total_props) for prop in col_props]
+        self.main_quotation_header(headers, col_widths)
+        for i, row in enumerate(data, 1):
+            row_data = [
+                str(i),
+                row["items_services"],
+                str(row["qty"]),
+                f"{row['unit_price']:.2f}",
+                f"{row['taxable_value']:.2f}",
+                "IGST 18%",
+                f"{row['taxable_value'] + row['tax']:.2f}"
+            ]
+            # Calculate the height needed for the Items/Services cell once,
+            # then draw its lines directly instead of splitting again
+            lines = self.split_lines(col_widths[1], row_data[1])
+            row_height = max(8, 5 * len(lines))
+            # Rows never straddle pages; repeat the header on each new page
+            if self.ensure_space(row_height):
+                self.main_quotation_header(headers, col_widths)
+            y_start = self.get_y()
+            x_start = self.get_x()
+            # S. No.
+            self.set_xy(x_start, y_start)
+            self.cell(col_widths[0], row_height, row_data[0], border=1)
+            # Items/Services
+            x_items = x_start + col_widths[0]
+            self.rect(x_items, y_start, col_widths[1], row_height)
+            for n, line in enumerate(lines):
+                self.set_xy(x_items, y_start + 5 * n)
+                self.cell(col_widths[1], 5, line, border=0, align="L")
+            # Move to the right for the rest of the cells
+            self.set_xy(x_items + col_widths[1], y_start)
+            for j in range(2, 7):
+                cell_text = row_data[j]
+                if j in [3, 4, 5] and len(cell_text) > 15:
+                    cell_text = cell_text[:12] + '...'
+                self.cell(col_widths[j], row_height, cell_text, border=1, align="R" if j in [3, 5, 6] else "C")
+            self.set_xy(x_start, y_start)
+            self.ln(row_height)
+        # Keep the Grand Total and Amount in Words rows together
+        label_width = col_widths[0] + col_widths[1]
+        value_width = sum(col_widths[2:])
+        self.set_font("Arial", "", 10)
+        words_lines = self.split_lines(value_width, amount_words)
+        self.ensure_space(8 + 8 * len(words_lines))
+        # Grand Total row
+        self.set_font("Arial", "B", 10)
+        # Label cell spanning first 4 columns
+        self.cell(sum(col_widths[:4]), 8, "Grand Total:", border=1)
+        # Taxable Value column (empty)
+        self.cell(col_widths[4], 8, "", border=1)
+        # Tax column (tax amount)
+        self.cell(col_widths[5], 8, f"INR {tax:,.2f}", border=1, align="R")
+        # Subtotal column (grand total)
+        self.cell(col_widths[6], 8, f"INR {grand_total:,.2f}", border=1, align="C")
+        self.ln()
+        # Amount in Words row
+        value_height = 8 * len(words_lines)
+        y_start = self.get_y()
+        x_start = self.get_x()
+        self.set_xy(x_start, y_start)
+        self.set_font("Arial", "B", 10)
+        self.cell(label_width, value_height, "Amount in Words:", border=1)
+        self.set_xy(x_start + label_width, y_start)
+        self.set_font("Arial", "", 10)
+        self.multi_cell(value_width, 8, amount_words, border=1)
+        self.ln(2)
+        self.ln(8)
+
+
+def table_data(data):
+    # (columns, row tuples) of a DataFrame or a list of row dicts
+    if hasattr(data, "itertuples"):
+        return list(data.columns), data.itertuples(index=False, name=None)
+    columns = list(data[0]) if data else []
+    return columns, [tuple(row[col] for col in columns) for row in data]
+
+
+def quotation_tables(quote):
+    # Annex tables as lists of row dicts; enough to render a PDF without pandas
+    return vm_table_rows(quote), management_table_rows(quote), summary_rows(quote)
+
+
+def quotation_dataframes(quote):
+    # pandas is only needed by the app's on-screen tables, so it isn't
+    # imported by batch workers that only render
+    import pandas as pd
+    df_vm = pd.DataFrame(vm_table_rows(quote))
+    df_vm.index += 1
+    df_mgmt = pd.DataFrame(management_table_rows(quote))
+    df_mgmt.index += 1
+    df_summary = pd.DataFrame(summary_rows(quote))
+    df_summary.index += 1
+    return df_vm, df_mgmt, df_summary
+
+
+def build_quotation_pdf(quote, customer_info, quotation_info, logo_path=LOGO_PATH, dataframes=None, itemized=False, paise_words=False, scenarios=None):
+    # `dataframes` may be DataFrames (the app's, already built) or row lists;
+    # `scenarios` (e.g. scenario_sweep.annex_rows()) adds a comparison annex
+    df_vm, df_mgmt, df_summary = dataframes if dataframes is not None else quotation_tables(quote)
+
+    pdf = PDF()
+    pdf.add_page()
+    with stage("pdf.header"):
+        pdf.quotation_header(logo_path, customer_info, quotation_info)
+    with stage("pdf.main_table"):
+        pdf.main_quotation_table(
+            data=main_table_rows(quote, itemized),
+            grand_total=quote["grand_total"],
+            tax=quote["tax"],
+            amount_words=amount_in_words(quote["grand_total"], paise=paise_words)
+        )
+    # Add Terms & Conditions at the end of the quotation's last page, moving
+    # to a fresh page if a long itemized table already reaches the footer
+    with stage("pdf.terms"):
+        if pdf.get_y() > pdf.h - 40:
+            pdf.add_page()
+        pdf.add_terms_and_conditions()
+
+    pdf.add_page()
+    with stage("pdf.table", title="Infrastructure Cost", rows=len(df_vm)):
+        pdf.table("Infrastructure Cost", df_vm)
+    with stage("pdf.table", title="Management Services", rows=len(df_mgmt)):
+        pdf.table("Management Services", df_mgmt)
+    with stage("pdf.summary"):
+        pdf.simple_table(df_summary)
+
+    if scenarios:
+        pdf.add_page()
+        with stage("pdf.table", title="Pricing Scenarios", rows=len(scenarios)):
+            pdf.table("Annex: Pricing Scenarios", scenarios)
+    return pdf
+
+
+def pdf_bytes(pdf):
+    # fpdf2 serializes to an in-memory bytearray when no file name is given
+    with stage("pdf.output", pages=pdf.pages_count):
+        return bytes(pdf.output())
+
+
+def render_quotation_bytes(quote, customer_info, quotation_info, logo_path=LOGO_PATH, dataframes=None, itemized=False, paise_words=False, scenarios=None):
+    with stage("pdf.render", quotation=quotation_info.get("number")):
+        return pdf_bytes(build_quotation_pdf(quote, customer_info, quotation_info, logo_path, dataframes, itemized, paise_words, scenarios))
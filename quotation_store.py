@@ -0,0 +1,340 @@
+"""Persistent store of issued quotations.
+
+Every quotation issued from the app, from the API's POST /quote/pdf and
+from batch.py --issue is recorded in a local SQLite database with its
+inputs, computed totals, the catalog it was priced against and the PDF, so
+it can be looked up and re-downloaded later:
+
+    python quotation_store.py search --customer "Acme" --from 2026-04-01
+    python quotation_store.py pdf QT/2026-27/00042 -o quote.pdf
+
+Quotation numbers are allocated per Indian financial year
+(QT/2026-27/00001, QT/2026-27/00002, ...) inside the short write transaction
+that records the quotation, so concurrent users never get the same number.
+The PDF is rendered after that transaction and attached to the record; a
+failed render removes the record again and, if no later number has been
+handed out, returns its number to the series. The database runs in WAL
+mode so searches don't block while quotations are being issued.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+from catalog import get_catalog
+from quote_cache import canonical_key
+
+STORE_PATH = os.environ.get("QUOTATION_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "quotations.db")
+NUMBER_PREFIX = "QT"
+SEARCH_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotation_counters (
+    series TEXT PRIMARY KEY,
+    last_value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quotation_pdfs (
+    sha256 TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quotations (
+    id INTEGER PRIMARY KEY,
+    number TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    quotation_date TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    customer_name TEXT NOT NULL COLLATE NOCASE,
+    customer_gstn TEXT NOT NULL COLLATE NOCASE,
+    customer_email TEXT NOT NULL,
+    customer_address TEXT NOT NULL,
+    region TEXT,
+    catalog_version TEXT,
+    catalog_fingerprint TEXT,
+    final_total REAL NOT NULL,
+    tax REAL NOT NULL,
+    grand_total REAL NOT NULL,
+    inputs TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    pdf_sha256 TEXT REFERENCES quotation_pdfs (sha256)
+);
+CREATE INDEX IF NOT EXISTS quotations_customer_name ON quotations (customer_name, quotation_date);
+CREATE INDEX IF NOT EXISTS quotations_customer_gstn ON quotations (customer_gstn, quotation_date);
+CREATE INDEX IF NOT EXISTS quotations_date ON quotations (quotation_date);
+"""
+
+# Columns returned by search(); the inputs, full quote and PDF are only
+# loaded by get() and pdf()
+SUMMARY_COLUMNS = (
+    "number", "quotation_date", "created_at", "customer_name", "customer_gstn", "customer_email",
+    "region", "catalog_version", "final_total", "tax", "grand_total", "pdf_sha256",
+)
+
+
+def iso_date(value):
+    # Quotation dates arrive as date objects from the app and as dd-mm-yyyy
+    # strings from batch files; stored as yyyy-mm-dd so ranges sort correctly
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    for fmt in ("%d-%m-%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value), fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"quotation date {value!r} is not dd-mm-yyyy or yyyy-mm-dd")
+
+
+def financial_year(day):
+    # Indian financial year (April to March) of a yyyy-mm-dd date, e.g. 2026-27
+    year, month = int(day[:4]), int(day[5:7])
+    start = year if month >= 4 else year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+class QuotationExists(ValueError):
+    pass
+
+
+class QuotationStore:
+    def __init__(self, path=STORE_PATH, number_prefix=NUMBER_PREFIX, timeout=30.0):
+        self.path = path
+        self.number_prefix = number_prefix
+        self.timeout = timeout
+        # sqlite3 connections can't be shared across threads, and Streamlit
+        # serves each session from its own thread
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; write transactions are opened explicitly with
+            # BEGIN IMMEDIATE so number allocation takes the write lock up front
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def __getstate__(self):
+        # Sent to render workers without its connections; each process opens its own
+        return {"path": self.path, "number_prefix": self.number_prefix, "timeout": self.timeout}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _next_number(self, conn, quotation_date):
+        series = f"{self.number_prefix}/{financial_year(quotation_date)}"
+        (value,) = conn.execute(
+            "INSERT INTO quotation_counters (series, last_value) VALUES (?, 1) "
+            "ON CONFLICT (series) DO UPDATE SET last_value = last_value + 1 RETURNING last_value",
+            (series,),
+        ).fetchone()
+        return f"{series}/{value:05d}"
+
+    def _allocate_number(self, conn, quotation_date):
+        # Next number in the series that isn't taken yet: a number entered by
+        # hand may already use one the counter hasn't reached
+        while True:
+            number = self._next_number(conn, quotation_date)
+            if conn.execute("SELECT 1 FROM quotations WHERE number = ?", (number,)).fetchone() is None:
+                return number
+
+    def issue(self, quote, customer_info, quotation_info, inputs=None, render=None):
+        # Record a quotation and return its stored summary plus "pdf" bytes.
+        # A blank quotation_info["number"] is allocated from the sequence.
+        # render(quotation_info) is called with the final number filled in
+        # and returns the PDF bytes (or None).
+        # Issuing a number that already exists with identical inputs returns
+        # the stored quotation; with different inputs it raises QuotationExists.
+        quotation_date = iso_date(quotation_info.get("date") or date.today())
+        catalog = get_catalog(quote.get("region"), quote.get("catalog_version"))
+        inputs = inputs if inputs is not None else {"spec": quote["spec"]}
+        number = str(quotation_info.get("number") or "").strip()
+        allocated = not number
+        conn = self.connection()
+        # The write lock is only held to allocate the number and record the
+        # quotation; rendering (hundreds of ms, more under a profiler) happens
+        # after it is released, so concurrent issuers don't queue behind it
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if allocated:
+                number = self._allocate_number(conn, quotation_date)
+            quotation_info = dict(quotation_info, number=number)
+            input_hash = canonical_key(catalog.fingerprint, inputs, customer_info, quotation_info)
+
+            existing = conn.execute("SELECT input_hash, pdf_sha256 FROM quotations WHERE number = ?", (number,)).fetchone()
+            if existing is None:
+                conn.execute(
+                    "INSERT INTO quotations (number, quotation_date, created_at, customer_name, customer_gstn, customer_email, "
+                    "customer_address, region, catalog_version, catalog_fingerprint, final_total, tax, grand_total, inputs, quote, "
+                    "input_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        number, quotation_date, time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        customer_info.get("name") or "", customer_info.get("gstn") or "",
+                        customer_info.get("email") or "", customer_info.get("address") or "",
+                        catalog.region, catalog.version, catalog.fingerprint,
+                        quote["final_total"], quote["tax"], quote["grand_total"],
+                        json.dumps(inputs, sort_keys=True, default=str), json.dumps(quote, sort_keys=True, default=str),
+                        input_hash,
+                    ),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        if existing is not None:
+            if existing["input_hash"] != input_hash:
+                raise QuotationExists(f"quotation {number} has already been issued with different details")
+            # A re-issue also renders a PDF an earlier attempt never attached
+            if existing["pdf_sha256"] is not None or render is None:
+                return dict(self.get(number), pdf=self.pdf(number))
+
+        pdf_data = None
+        if render is not None:
+            try:
+                pdf_data = render(quotation_info)
+            except BaseException:
+                if existing is None:
+                    self._release(number, allocated)
+                raise
+        if pdf_data is not None:
+            self._attach_pdf(number, pdf_data)
+        return dict(self.get(number), pdf=pdf_data)
+
+    def _release(self, number, allocated):
+        # Undo a quotation whose PDF failed to render. Its number goes back
+        # to the series too, unless a later quotation has been given one.
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM quotations WHERE number = ?", (number,))
+            if allocated:
+                series, value = number.rsplit("/", 1)
+                conn.execute("UPDATE quotation_counters SET last_value = last_value - 1 WHERE series = ? AND last_value = ?", (series, int(value)))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _attach_pdf(self, number, pdf_data):
+        pdf_sha256 = hashlib.sha256(pdf_data).hexdigest()
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO quotation_pdfs (sha256, data) VALUES (?, ?)", (pdf_sha256, pdf_data))
+            conn.execute("UPDATE quotations SET pdf_sha256 = ? WHERE number = ?", (pdf_sha256, number))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def get(self, number):
+        # Summary columns plus the decoded inputs and quote, or None
+        row = self.connection().execute("SELECT * FROM quotations WHERE number = ?", (number,)).fetchone()
+        if row is None:
+            return None
+        record = {column: row[column] for column in SUMMARY_COLUMNS}
+        record["customer_address"] = row["customer_address"]
+        record["inputs"] = json.loads(row["inputs"])
+        record["quote"] = json.loads(row["quote"])
+        return record
+
+    def pdf(self, number):
+        row = self.connection().execute(
+            "SELECT p.data FROM quotations q JOIN quotation_pdfs p ON p.sha256 = q.pdf_sha256 WHERE q.number = ?", (number,)
+        ).fetchone()
+        return bytes(row["data"]) if row is not None else None
+
+    def search(self, customer=None, gstn=None, date_from=None, date_to=None, number=None, limit=SEARCH_LIMIT):
+        # Newest first. `customer` and `number` match as case-insensitive
+        # prefixes so they stay on the indexes; dates are inclusive.
+        clauses, params = [], []
+        if customer:
+            clauses.append("customer_name LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(customer))
+        if gstn:
+            clauses.append("customer_gstn = ?")
+            params.append(gstn.strip())
+        if date_from:
+            clauses.append("quotation_date >= ?")
+            params.append(iso_date(date_from))
+        if date_to:
+            clauses.append("quotation_date <= ?")
+            params.append(iso_date(date_to))
+        if number:
+            clauses.append("number LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(number))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM quotations {where} ORDER BY quotation_date DESC, id DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _like_prefix(text):
+    escaped = text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up issued quotations.")
+    parser.add_argument("--db", default=STORE_PATH, help="quotation database (default: $QUOTATION_DB or quotations.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="list matching quotations as JSON lines, newest first")
+    search.add_argument("--customer", help="customer name prefix")
+    search.add_argument("--gstn", help="exact customer GSTN")
+    search.add_argument("--from", dest="date_from", help="first quotation date (yyyy-mm-dd)")
+    search.add_argument("--to", dest="date_to", help="last quotation date (yyyy-mm-dd)")
+    search.add_argument("--number", help="quotation number prefix")
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    show = commands.add_parser("show", help="print one quotation's inputs and totals as JSON")
+    show.add_argument("number")
+    pdf = commands.add_parser("pdf", help="write one quotation's PDF")
+    pdf.add_argument("number")
+    pdf.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    store = QuotationStore(args.db)
+    if args.command == "search":
+        for record in store.search(args.customer, args.gstn, args.date_from, args.date_to, args.number, args.limit):
+            print(json.dumps(record))
+    elif args.command == "show":
+        record = store.get(args.number)
+        if record is None:
+            sys.exit(f"no quotation {args.number}")
+        print(json.dumps(record, indent=2))
+    else:
+        data = store.pdf(args.number)
+        if data is None:
+            sys.exit(f"no PDF stored for quotation {args.number}")
+        if args.output:
+            with open(args.output, "wb") as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""In-process LRU/TTL cache for priced quotations and rendered PDFs.
+
+Keys are a canonical hash of the quotation inputs, so identical inputs from
+any Streamlit session or rerun share one entry. Thread-safe: Streamlit serves
+each session from its own thread.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_key(*parts):
+    # Key order, whitespace and dates (via str) are normalized before hashing
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuoteCache:
+    def __init__(self, maxsize=256, ttl=900, max_bytes=None, sizeof=None):
+        # maxsize caps the entry count, max_bytes (with `sizeof`) the total
+        # size of the values; ttl is in seconds, None to never expire
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._drop(key)
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.maxsize or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        # The lock is not held while computing; two sessions racing on the
+        # same new key both compute it and the last one wins
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
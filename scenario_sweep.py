@@ -0,0 +1,169 @@
+"""Scenario sweeps: price every combination of a few quotation inputs at once.
+
+Sales compare totals across VM counts, discounts, bandwidth plans and
+management quantities. sweep() takes a normalized spec plus lists of values
+for any of SWEEP_AXES and prices the whole cartesian grid in one numpy pass,
+with the same rules as pricing.price_quotation() and identical totals point
+for point. Axes not given keep the spec's value.
+
+    grid = sweep(spec, catalog, num_vms=parse_values("10, 20, 50"), discount=parse_values("5-25:5"),
+                 bandwidth=["Default", "Dedicated 10 MBPS"])
+    grid["grand_total"]  # one entry per scenario, first axis varying slowest
+
+num_vms sweeps the first VM group (the app's "How many VMs?" input); any
+other groups keep their counts. Scenarios where antivirus or backup exceed
+the estate's VM count, which normalize_spec() would reject, are left out.
+"""
+import re
+from math import prod
+
+import numpy as np
+
+from catalog import get_catalog
+from pricing import IGST_RATE, management_price_key, price_vm
+
+SWEEP_AXES = ("num_vms", "discount", "bandwidth", "antivirus", "backup", "db", "os_qty")
+SWEEP_LABELS = {
+    "num_vms": "VMs",
+    "discount": "Discount (%)",
+    "bandwidth": "Bandwidth",
+    "antivirus": "Antivirus",
+    "backup": "Backup",
+    "db": "Databases",
+    "os_qty": "OS Mgmt",
+}
+TOTAL_COLUMNS = ("total_vm_monthly", "total_vm_annual", "mgmt_monthly", "mgmt_annual", "bandwidth_cost", "discount_amt", "final_total", "tax", "grand_total")
+
+# 2M points is ~300 MB of columns; anything bigger is a typo in a range
+MAX_POINTS = 2_000_000
+# Scenarios that still make a readable PDF annex
+ANNEX_MAX_ROWS = 500
+
+_RANGE = re.compile(r"^(\d+)\s*-\s*(\d+)(?:\s*:\s*(\d+))?$")
+
+
+def parse_values(text):
+    # Sorted distinct whole numbers from "10, 20, 50", "5-25:5" (inclusive,
+    # step 5) or a mix of both; blank gives None, i.e. keep the spec's value
+    values = set()
+    for part in str(text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part.isdigit():
+            values.add(int(part))
+            continue
+        match = _RANGE.match(part)
+        if not match:
+            raise ValueError(f"expected numbers like 10, 20 or ranges like 5-25:5, got {part!r}")
+        start, stop, step = int(match[1]), int(match[2]), int(match[3] or 1)
+        if stop < start or step < 1:
+            raise ValueError(f"range {part!r} must go upwards in steps of at least 1")
+        values.update(range(start, stop + 1, step))
+    return sorted(values) or None
+
+
+def _axis_values(spec, pricing, axis, given):
+    if given is None or not len(given):
+        return [spec["vm_groups"][0]["num_vms"] if axis == "num_vms" else spec[axis]]
+    values = list(dict.fromkeys(given))
+    if axis == "bandwidth":
+        unknown = [value for value in values if value not in pricing["bandwidth"]]
+        if unknown:
+            raise ValueError(f"bandwidth must be one of {list(pricing['bandwidth'])}, got {unknown}")
+        return values
+    minimum, maximum = {"num_vms": (1, None), "discount": (0, 100)}.get(axis, (0, None))
+    for value in values:
+        if not isinstance(value, (int, np.integer)) or isinstance(value, bool):
+            raise ValueError(f"{axis} values must be whole numbers, got {value!r}")
+        if value < minimum or (maximum is not None and value > maximum):
+            raise ValueError(f"{axis} values must be {f'between {minimum} and {maximum}' if maximum is not None else f'at least {minimum}'}, got {value}")
+    return values
+
+
+def round_money(values):
+    # round(x, 2) for every element, exactly as Python rounds a float.
+    # np.round() scales by 100 first, which can tip a value lying a hair off
+    # half a paisa the other way, so those few are rounded in Python.
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9 + np.abs(scaled) * 1e-15
+    if near_half.any():
+        rounded[near_half] = [round(value, 2) for value in values[near_half].tolist()]
+    return rounded
+
+
+def sweep(spec, pricing=None, **axes):
+    # {axis or total column: array}, one entry per valid scenario. `spec` is
+    # expected to have gone through normalize_spec() (and the optimizer, if
+    # used); keyword arguments are lists of values for SWEEP_AXES.
+    pricing = pricing or get_catalog()
+    unknown = sorted(set(axes) - set(SWEEP_AXES))
+    if unknown:
+        raise ValueError(f"cannot sweep {unknown}, only {list(SWEEP_AXES)}")
+    values = {axis: _axis_values(spec, pricing, axis, axes.get(axis)) for axis in SWEEP_AXES}
+    points = prod(len(v) for v in values.values())
+    if points > MAX_POINTS:
+        raise ValueError(f"{points:,} scenarios is more than the {MAX_POINTS:,} a sweep can price, narrow the ranges")
+
+    # Bandwidth is swept by position in its list of plan names
+    bandwidth_names = np.array(values["bandwidth"], dtype=object)
+    axis_arrays = [np.arange(len(bandwidth_names)) if axis == "bandwidth" else np.array(values[axis], dtype=np.int64) for axis in SWEEP_AXES]
+    grid = dict(zip(SWEEP_AXES, (a.ravel() for a in np.meshgrid(*axis_arrays, indexing="ij"))))
+
+    # Per-VM prices don't depend on any swept input, so each group is priced once
+    groups = spec["vm_groups"]
+    per_vm_cost = [
+        price_vm(g["vcpu"], g["ram"], g["storage"], 1, pricing, pricing["vm_configs"][g["tier"]] if g.get("tier") else None)["per_vm_cost"]
+        for g in groups
+    ]
+    other_vms = sum(g["num_vms"] for g in groups[1:])
+    other_monthly = sum(cost * g["num_vms"] for cost, g in zip(per_vm_cost[1:], groups[1:]))
+
+    total_vms = grid["num_vms"] + other_vms
+    valid = (grid["antivirus"] <= total_vms) & (grid["backup"] <= total_vms)
+    if not valid.all():
+        grid = {axis: column[valid] for axis, column in grid.items()}
+
+    management = pricing["management"]
+    result = {axis: grid[axis] for axis in SWEEP_AXES}
+    result["bandwidth"] = bandwidth_names[grid["bandwidth"]]
+    result["total_vm_monthly"] = per_vm_cost[0] * grid["num_vms"] + other_monthly
+    result["total_vm_annual"] = result["total_vm_monthly"] * 12
+    result["mgmt_monthly"] = (
+        grid["antivirus"] * management["antivirus"]
+        + grid["os_qty"] * management[management_price_key(spec["os_type"])]
+        + grid["backup"] * management["backup_management"]
+        + grid["db"] * management["database_management"]
+    )
+    result["mgmt_annual"] = result["mgmt_monthly"] * 12
+    result["bandwidth_cost"] = np.array([pricing["bandwidth"][name] for name in bandwidth_names])[grid["bandwidth"]]
+
+    # Same operation order as price_quotation(), so the floats match bit for bit
+    recurring_annual = result["total_vm_annual"] + result["mgmt_annual"]
+    result["discount_amt"] = recurring_annual * (grid["discount"] / 100)
+    result["final_total"] = recurring_annual + result["bandwidth_cost"] - result["discount_amt"]
+    result["tax"] = round_money(result["final_total"] * IGST_RATE)
+    result["grand_total"] = result["final_total"] + result["tax"]
+    return result
+
+
+def swept_axes(grid):
+    # Axes with more than one value in the grid, in SWEEP_AXES order
+    return [axis for axis in SWEEP_AXES if len(grid[axis]) and (grid[axis] != grid[axis][0]).any()]
+
+
+def annex_rows(grid, limit=ANNEX_MAX_ROWS):
+    # Scenario rows for the PDF annex: the swept inputs, the taxable value and
+    # the grand total, as display strings like summary_rows()
+    count = len(grid["grand_total"])
+    if count > limit:
+        raise ValueError(f"{count:,} scenarios is too many for a PDF annex (at most {limit})")
+    columns = {axis: grid[axis].tolist() for axis in swept_axes(grid)}
+    rows = []
+    for i, (final_total, grand_total) in enumerate(zip(grid["final_total"].tolist(), grid["grand_total"].tolist())):
+        row = {SWEEP_LABELS[axis]: values[i] for axis, values in columns.items()}
+        row["Final Quotation"] = f"INR {final_total:,.0f}"
+        row["Grand Total (incl. IGST)"] = f"INR {grand_total:,.2f}"
+        rows.append(row)
+    return rows
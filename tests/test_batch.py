@@ -0,0 +1,55 @@
+import csv
+import json
+
+import pytest
+
+from batch import iter_rows, run_batch
+from pricing import normalize_spec
+from quotation_store import QuotationStore
+
+
+def test_csv_byte_order_mark_is_not_part_of_the_first_column(tmp_path):
+    path = tmp_path / "deals.csv"
+    path.write_bytes(b"\xef\xbb\xbfnum_vms,vcpu,quotation_no\r\n10,4,B1\r\n")
+    (row,) = iter_rows(str(path))
+    assert row["num_vms"] == "10"
+
+
+def test_unknown_columns_fail_the_row(tmp_path):
+    path = tmp_path / "deals.jsonl"
+    path.write_text('{"vpcu": 2}\n{"vcpu": 2}\n', encoding="utf-8")
+    bad, good = iter_rows(str(path))
+    assert isinstance(bad, ValueError) and "vpcu" in str(bad)
+    assert good == {"vcpu": 2}
+
+
+def test_fractional_quantities_are_rejected():
+    with pytest.raises(ValueError, match="whole number"):
+        normalize_spec({"vcpu": 4.7})
+    assert normalize_spec({"vcpu": 4.0})["vcpu"] == 4
+
+
+def test_issued_rows_are_numbered_and_recorded(tmp_path):
+    path = tmp_path / "deals.csv"
+    path.write_text("num_vms,vcpu,quotation_no,quotation_date\n1,2,,01-10-2026\n1,4,B1,01-10-2026\n", encoding="utf-8")
+    store = QuotationStore(str(tmp_path / "quotations.db"))
+    count, failed, _, _ = run_batch(str(path), str(tmp_path / "issued.csv"), out_dir=str(tmp_path / "pdfs"), store=store)
+    assert (count, failed) == (2, 0)
+    with open(tmp_path / "issued.csv", newline="", encoding="utf-8") as f:
+        numbers = [row["quotation_no"] for row in csv.DictReader(f)]
+    assert numbers == ["QT/2026-27/00001", "B1"]
+    assert sorted(record["number"] for record in store.search()) == sorted(numbers)
+    assert store.pdf("B1") == (tmp_path / "pdfs" / "B1.pdf").read_bytes()
+
+
+def test_json_files_are_arrays_of_rows(tmp_path):
+    path = tmp_path / "deals.json"
+    path.write_text('[{"vcpu": 2}, {"vcpu": 4, "num_vms": 2}]', encoding="utf-8")
+    results = tmp_path / "priced.json"
+    assert run_batch(str(path), str(results))[:2] == (2, 0)
+    priced = json.loads(results.read_text(encoding="utf-8"))
+    assert [row["vcpu"] for row in priced] == [2, 4]
+
+    path.write_text('{"vcpu": 2}', encoding="utf-8")
+    with pytest.raises(ValueError, match="JSON array"):
+        run_batch(str(path), str(results))
@@ -0,0 +1,17 @@
+import os
+import shutil
+
+from catalog import CATALOG_DIR, CatalogRegistry
+
+
+def test_half_copied_catalog_is_skipped(tmp_path):
+    shutil.copytree(CATALOG_DIR, tmp_path / "catalogs")
+    current = CatalogRegistry(str(tmp_path / "catalogs")).get()
+    with open(tmp_path / "catalogs" / current.region / "9999-Q1.json", "w", encoding="utf-8") as f:
+        f.write('{"vm_configs": {')
+    registry = CatalogRegistry(str(tmp_path / "catalogs"), check_interval=0)
+    assert registry.get().version == current.version
+    assert registry.get(version=current.version).fingerprint == current.fingerprint
+    assert "9999-Q1" not in registry.versions(current.region)
+    os.remove(tmp_path / "catalogs" / current.region / "9999-Q1.json")
+    assert registry.get().version == current.version
@@ -0,0 +1,12 @@
+import pytest
+
+from benchmarks.import_budget import ENTRY_POINTS, import_times
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_point_does_not_import_forbidden_modules(module):
+    # Only the forbidden modules are checked here; the millisecond budgets
+    # depend on the machine and stay in benchmarks/import_budget.py
+    _, forbidden = ENTRY_POINTS[module]
+    times = import_times(module)
+    assert sorted(name for name in forbidden if name in times) == []
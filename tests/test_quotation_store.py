@@ -0,0 +1,39 @@
+import pytest
+
+from pricing import normalize_spec, price_quotation
+from quotation_store import QuotationStore
+
+CUSTOMER_INFO = {"name": "Acme Corp", "address": "Noida", "gstn": "", "email": ""}
+
+
+def issue(store, number="", vcpu=2):
+    quote = price_quotation(normalize_spec({"num_vms": 1, "vcpu": vcpu}))
+    return store.issue(quote, CUSTOMER_INFO, {"number": number, "date": "01-10-2026"}, render=lambda info: info["number"].encode())
+
+
+def test_allocation_skips_numbers_issued_by_hand(tmp_path):
+    store = QuotationStore(str(tmp_path / "quotations.db"))
+    issue(store, "QT/2026-27/00002", vcpu=8)
+    assert issue(store, vcpu=1)["number"] == "QT/2026-27/00001"
+    assert issue(store, vcpu=2)["number"] == "QT/2026-27/00003"
+    assert issue(store, vcpu=4)["number"] == "QT/2026-27/00004"
+
+
+def test_failed_render_returns_the_number(tmp_path):
+    store = QuotationStore(str(tmp_path / "quotations.db"))
+    quote = price_quotation(normalize_spec({"num_vms": 1, "vcpu": 2}))
+
+    def fail(info):
+        raise RuntimeError("render failed")
+    with pytest.raises(RuntimeError):
+        store.issue(quote, CUSTOMER_INFO, {"number": "", "date": "01-10-2026"}, render=fail)
+    assert store.search() == []
+    assert issue(store)["number"] == "QT/2026-27/00001"
+
+
+def test_reissue_attaches_a_missing_pdf(tmp_path):
+    store = QuotationStore(str(tmp_path / "quotations.db"))
+    first = issue(store, "Q-1")
+    store.connection().execute("UPDATE quotations SET pdf_sha256 = NULL")
+    again = issue(store, "Q-1")
+    assert again["number"] == first["number"] and again["pdf"] == b"Q-1" == store.pdf("Q-1")
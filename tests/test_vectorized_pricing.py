@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from catalog import get_catalog
+from pricing import price_vm
+from vectorized_pricing import price_vms
+
+
+@pytest.mark.parametrize("as_dict", [False, True], ids=["catalog", "dict"])
+def test_price_vms_matches_price_vm(as_dict):
+    catalog = get_catalog()
+    pricing = dict(catalog) if as_dict else catalog
+    rng = np.random.default_rng(2026)
+    vcpu = rng.integers(0, 200, 2000)
+    ram = rng.integers(1, 1024, 2000)
+    storage = rng.integers(1, 20000, 2000)
+    num_vms = rng.integers(1, 100, 2000)
+    priced = price_vms(vcpu, ram, storage, num_vms, pricing)
+    for i in range(len(vcpu)):
+        expected = price_vm(int(vcpu[i]), int(ram[i]), int(storage[i]), int(num_vms[i]), pricing)
+        assert pricing["vm_configs"][priced["base_vm"][i]] is expected["base_vm"]
+        for key, value in expected.items():
+            if key != "base_vm":
+                assert priced[key][i].item() == value, key
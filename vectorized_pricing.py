@@ -0,0 +1,79 @@
+"""Vectorized VM pricing for whole fleets / renewal books.
+
+Same rules as pricing.price_vm(), evaluated over arrays in one pass, with
+results identical to the scalar path row for row.
+"""
+import numpy as np
+
+from catalog import get_catalog
+
+
+def tier_table(pricing):
+    # Sorted vCPU tiers for np.searchsorted. A Catalog already carries that
+    # index; a plain dict is indexed the same way, keeping the first config
+    # in catalog order on a vCPU tie as get_base_vm() does.
+    if hasattr(pricing, "tier_configs"):
+        names, configs = pricing.tier_names, pricing.tier_configs
+    else:
+        first = {}
+        for name, config in pricing["vm_configs"].items():
+            first.setdefault(config["vCPU"], name)
+        names = [first[vcpu] for vcpu in sorted(first)]
+        configs = [pricing["vm_configs"][name] for name in names]
+    return {
+        "names": np.array(names, dtype=object),
+        "vCPU": np.array([c["vCPU"] for c in configs], dtype=np.int64),
+        "RAM": np.array([c["RAM"] for c in configs], dtype=np.int64),
+        "Storage": np.array([c["Storage"] for c in configs], dtype=np.int64),
+        "Price": np.array([c["Price"] for c in configs], dtype=np.int64),
+    }
+
+
+def price_vms(vcpu, ram, storage, num_vms, pricing=None):
+    pricing = pricing or get_catalog()
+    vcpu = np.asarray(vcpu, dtype=np.int64)
+    ram = np.asarray(ram, dtype=np.int64)
+    storage = np.asarray(storage, dtype=np.int64)
+    num_vms = np.asarray(num_vms, dtype=np.int64)
+    tiers = tier_table(pricing)
+    add_ons = pricing["add_ons"]
+
+    # Largest tier with vCPU <= requested, falling back to the smallest tier
+    base = np.maximum(np.searchsorted(tiers["vCPU"], vcpu, side="right") - 1, 0)
+    base_vcpu = tiers["vCPU"][base]
+    base_ram = tiers["RAM"][base]
+    base_storage = tiers["Storage"][base]
+    base_price = tiers["Price"][base]
+
+    extra_vcpu = np.maximum(0, vcpu - base_vcpu)
+    extra_ram = np.maximum(0, ram - base_ram)
+    extra_storage = np.maximum(0, storage - base_storage)
+
+    vcpu_cost = extra_vcpu * add_ons["vcpu_unit_price"]
+    ram_cost = extra_ram * add_ons["ram_per_gb"]
+    storage_cost = ((extra_storage + 49) // 50) * add_ons["storage_per_50gb"]
+    per_vm_cost = base_price + vcpu_cost + ram_cost + storage_cost
+    total_vm_monthly = per_vm_cost * num_vms
+    return {
+        "base_vm": tiers["names"][base],
+        "base_vcpu": base_vcpu,
+        "base_ram": base_ram,
+        "base_storage": base_storage,
+        "base_price": base_price,
+        "extra_vcpu": extra_vcpu,
+        "extra_ram": extra_ram,
+        "extra_storage": extra_storage,
+        "vcpu_cost": vcpu_cost,
+        "ram_cost": ram_cost,
+        "storage_cost": storage_cost,
+        "per_vm_cost": per_vm_cost,
+        "total_vm_monthly": total_vm_monthly,
+        "total_vm_annual": total_vm_monthly * 12,
+    }
+
+
+def price_fleet(df, pricing=None, vcpu="vcpu", ram="ram", storage="storage", num_vms="num_vms"):
+    # Price every row of a DataFrame of VM specs; returns a copy with the
+    # priced columns appended
+    priced = price_vms(df[vcpu].to_numpy(), df[ram].to_numpy(), df[storage].to_numpy(), df[num_vms].to_numpy(), pricing)
+    return df.assign(**priced)